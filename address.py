@@ -0,0 +1,86 @@
+import ipaddress
+import logging
+import socket
+from concurrent.futures import ThreadPoolExecutor, as_completed, TimeoutError as FuturesTimeoutError
+from urllib.parse import urlsplit
+
+IPV4 = 4
+IPV6 = 6
+
+
+def parse_host(url):
+    """
+    解析地址中的主机和端口，兼容 [IPv6]:port 以及不带方括号的 IPv6 字面量；
+    无法解析的地址（如方括号不完整）返回 ("", None)，按 IPv4 处理
+    """
+    try:
+        netloc = urlsplit(url).netloc.rsplit("@", 1)[-1]
+    except ValueError:
+        return "", None
+    if netloc.startswith("["):
+        host, _, rest = netloc[1:].partition("]")
+        port = rest[1:] if rest.startswith(":") else ""
+    elif netloc.count(":") > 1:
+        host, port = netloc, ""
+        if literal_family(netloc) is None:
+            head, _, tail = netloc.rpartition(":")
+            if tail.isdigit() and literal_family(head) == IPV6:
+                host, port = head, tail
+    else:
+        host, _, port = netloc.partition(":")
+    return host.lower(), int(port) if port.isdigit() else None
+
+
+def literal_family(host):
+    try:
+        return ipaddress.ip_address(host).version
+    except ValueError:
+        return None
+
+
+def resolve_family(host, port):
+    """
+    域名只解析到 AAAA 记录时判断为 IPv6，其余情况（包括解析失败）按 IPv4 处理
+    """
+    try:
+        families = {info[0] for info in socket.getaddrinfo(host, port or 80, type=socket.SOCK_STREAM)}
+    except (OSError, UnicodeError):
+        return IPV4
+    if socket.AF_INET not in families and socket.AF_INET6 in families:
+        return IPV6
+    return IPV4
+
+
+def classify_urls(urls, resolve=True, workers=32, deadline=30):
+    """
+    一次性判断所有地址的 IP 版本，返回 地址 -> IPV4/IPV6；
+    域名地址并发解析 DNS，每个域名只解析一次，超出总时限的按 IPv4 处理
+    """
+    families = {}
+    pending = {}
+    for url in set(urls):
+        host, port = parse_host(url)
+        family = literal_family(host)
+        if family or not resolve or not host:
+            families[url] = family or IPV4
+        else:
+            pending.setdefault((host, port), []).append(url)
+
+    if pending:
+        executor = ThreadPoolExecutor(max_workers=workers)
+        future_to_host = {
+            executor.submit(resolve_family, host, port): (host, port) for host, port in pending
+        }
+        try:
+            for future in as_completed(future_to_host, timeout=deadline):
+                for url in pending[future_to_host[future]]:
+                    families[url] = future.result()
+        except FuturesTimeoutError:
+            logging.info(f"域名解析超出总时限 {deadline}s，未完成的按 IPv4 处理")
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+        for urls_of_host in pending.values():
+            for url in urls_of_host:
+                families.setdefault(url, IPV4)
+
+    return families
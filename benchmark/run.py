@@ -0,0 +1,262 @@
+"""
+离线性能基准：不访问真实直播源和酒店源网站，在本地替身服务器上重放录制的内容，
+重复测量各阶段耗时，便于对比优化前后的结果。
+
+    python benchmark/run.py
+    python benchmark/run.py --scale 1 10 100 --repeat 5 --json before.json
+    python benchmark/run.py --only getHotel --bandwidth 300,1000 --latency 200
+
+直播源使用仓库中的 live.txt、live.m3u，并按 --scale 复制扩大（地址加前缀保证不重复）；
+酒店源搜索页和列表页使用 benchmark/fixtures 中的页面，通过 HTTP 代理把 www.foodieguide.com
+和 tonkiang.us 的请求转到本地，列表中的频道地址指向按指定带宽和延迟输出的本地视频流。
+"""
+
+import argparse
+import importlib.util
+import json
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from collections import OrderedDict
+from types import SimpleNamespace
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from server import BenchmarkServer  # noqa: E402
+
+SOURCE_FILES = ["live.txt", "live.m3u"]
+
+
+def scale_source(body, times):
+    """
+    把直播源内容复制 times 份，第 i 份的地址主机名加上 s{i}- 前缀，M3U 文件头只保留一个
+    """
+    lines = body.splitlines()
+    scaled = list(lines)
+    for copy in range(1, times):
+        for line in lines:
+            if line.startswith("#EXTM3U"):
+                continue
+            # M3U 的地址行和 TXT 的频道行，注释中的图标地址不变
+            if "://" in line and not line.startswith("#"):
+                line = line.replace("://", f"://s{copy}-", 1)
+            scaled.append(line)
+    return "\n".join(scaled) + "\n"
+
+
+def build_sources(scales):
+    sources = OrderedDict()
+    for file_name in SOURCE_FILES:
+        with open(os.path.join(ROOT, file_name), "r", encoding="utf-8") as f:
+            body = f.read()
+        base, ext = os.path.splitext(file_name)
+        for times in scales:
+            sources[f"{base}-x{times}{ext}"] = scale_source(body, times)
+    return sources
+
+
+def bs4_search_page(text):
+    """
+    原先基于 BeautifulSoup 的搜索页面提取，用于对比 hotel_page 的耗时
+    """
+    from bs4 import BeautifulSoup
+
+    root = BeautifulSoup(text, "lxml")
+    return [item.parent.parent.a.get_text().strip() for item in root.select('div[style="color:limegreen; "]')]
+
+
+def bs4_list_page(text):
+    from bs4 import BeautifulSoup
+
+    root = BeautifulSoup(text, "lxml")
+    return [(i.parent.select(".channel")[0].get_text().strip(), i.get_text().strip()) for i in root.select("div.m3u8")]
+
+
+def run_case(name, func, repeat, setup=None):
+    """
+    执行 repeat 次，每次之前调用 setup，返回耗时统计
+    """
+    timings = []
+    result = None
+    for _ in range(repeat):
+        if setup:
+            setup()
+        start_time = time.perf_counter()
+        result = func()
+        timings.append(time.perf_counter() - start_time)
+    stats = {
+        "repeat": repeat,
+        "min": min(timings),
+        "median": statistics.median(timings),
+        "mean": statistics.fmean(timings),
+        "max": max(timings),
+    }
+    print(f"{name:<40} {stats['min']:>9.4f} {stats['median']:>9.4f} {stats['mean']:>9.4f} {stats['max']:>9.4f}")
+    return stats, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="离线性能基准")
+    parser.add_argument("--repeat", type=int, default=3, help="每项重复次数")
+    parser.add_argument("--scale", type=int, nargs="+", default=[1, 10, 100], help="直播源放大倍数")
+    parser.add_argument("--hotels", type=int, default=8, help="可连通的酒店 IP 数量")
+    parser.add_argument("--bandwidth", default="500,2000,8000", help="酒店视频流带宽（KB/s），逗号分隔，按 IP 轮流使用")
+    parser.add_argument("--latency", type=int, default=50, help="视频流首字节延迟（毫秒）")
+    parser.add_argument("--only", nargs="+", help="只运行名称包含这些关键字的项目")
+    parser.add_argument("--json", help="把结果写入 JSON 文件")
+    args = parser.parse_args()
+
+    json_path = os.path.abspath(args.json) if args.json else None
+    workdir = tempfile.mkdtemp(prefix="iptv-benchmark-")
+    from playlist import create_parse_pool, parse_file, to_channels
+
+    # 解析进程池要在替身服务器线程启动之前创建
+    parse_pool = create_parse_pool(0)
+    server = BenchmarkServer(
+        build_sources(args.scale),
+        hotels=args.hotels,
+        bandwidths=[int(value) for value in args.bandwidth.split(",")],
+        latency=args.latency,
+    ).start()
+    # 酒店源网站的请求经代理转到替身服务器，本地地址直连
+    os.environ["HTTP_PROXY"] = server.base_url
+    os.environ["NO_PROXY"] = "127.0.0.0/8,localhost"
+    os.chdir(workdir)
+    shutil.copy(os.path.join(ROOT, "demo.txt"), "demo.txt")
+
+    import config
+    import main as pipeline
+    from address import IPV4
+    from blacklist import UrlBlacklist
+    from channel_table import ChannelTable
+    from checkpoint import Checkpoint
+    from http_cache import HttpCache
+    from template import TemplateCache
+
+    config.health_check = False
+    config.hotel_probe_deadline = 5
+    results = OrderedDict()
+
+    def selected(name):
+        return not args.only or any(keyword in name for keyword in args.only)
+
+    def case(name, func, setup=None, required=True):
+        """
+        未选中的项目只在后续项目需要它的结果时执行一次，不计时
+        """
+        if selected(name):
+            results[name], value = run_case(name, func, args.repeat, setup)
+            return value
+        return func() if required else None
+
+    print(f"工作目录：{workdir}，替身服务器：{server.base_url}")
+    print(f"{'项目':<38} {'最小':>7} {'中位数':>6} {'平均':>7} {'最大':>7}")
+
+    from hotel_page import parse_list_page, parse_search_page
+
+    extractors = [
+        (parse_search_page, bs4_search_page, [server.search_page("广东")]),
+        (parse_list_page, bs4_list_page, [server.list_page(address) for address in server.hotel_addresses]),
+    ]
+    # BeautifulSoup 只用于对照，没有安装时跳过；两者结果一致由 tests/test_hotel_page.py 检查
+    has_bs4 = importlib.util.find_spec("bs4") is not None
+    for parse, reference, texts in extractors:
+        # 页面重复到最大放大倍数，模拟一次运行中抓取大量页面
+        texts = texts * max(args.scale)
+        for label, func in (("bs4", reference), ("lxml", parse)):
+            if label == "bs4" and not has_bs4:
+                continue
+            case(f"{parse.__name__}[{label}]", lambda func=func, texts=texts: [func(text) for text in texts])
+
+    template_dirs = iter(range(10**6))
+    case(
+        "parse_template[cold]",
+        lambda: TemplateCache(os.path.join(".cache", "templates-cold", str(next(template_dirs)))).load("demo.txt"),
+    )
+    template = case("parse_template[warm]", lambda: TemplateCache(os.path.join(".cache", "templates")).load("demo.txt"))
+
+    def fresh_http_cache():
+        shutil.rmtree(os.path.join(".cache", "http-bench"), ignore_errors=True)
+        pipeline.http_cache = HttpCache(os.path.join(".cache", "http-bench"), 1 << 30, 0)
+
+    session = pipeline.create_session(config.fetch_workers)
+    for times in args.scale:
+        urls = [f"{server.base_url}/sources/{name}" for name in server.sources if f"-x{times}." in name]
+        fetched = OrderedDict()
+        for url in urls:
+            name = url.rsplit("/", 1)[1]
+            fetched[url] = case(
+                f"fetch_channels[{name}]", lambda url=url: pipeline.fetch_channels(url, session), fresh_http_cache
+            )
+
+        paths = []
+        for name in server.sources:
+            if f"-x{times}." in name:
+                with open(name, "w", encoding="utf-8") as f:
+                    f.write(server.sources[name])
+                paths.append(os.path.abspath(name))
+        case(f"parse_sources[x{times},thread]", lambda paths=paths: [to_channels(parse_file(p)) for p in paths])
+        if parse_pool is not None:
+            case(
+                f"parse_sources[x{times},process]",
+                lambda paths=paths: [to_channels(parsed) for parsed in parse_pool.map(parse_file, paths)],
+            )
+
+        table = ChannelTable()
+        for url, channels in fetched.items():
+            table.add_source(url, channels)
+        matched = case(
+            f"match_channels[x{times}]",
+            lambda: pipeline.match_channels(template, table, list(table.merged_rows(fetched))),
+        )
+
+        profile = SimpleNamespace(
+            output_name=f"bench-x{times}",
+            output_formats=config.output_formats,
+            ip_version_priority=config.ip_version_priority,
+            announcements=config.announcements,
+            epg_urls=config.epg_urls,
+        )
+        url_families = {url: IPV4 for channel_map in matched.values() for urls in channel_map.values() for url in urls}
+
+        def remove_outputs(profile=profile):
+            for output_format in pipeline.create_formats(profile.output_formats):
+                path = f"{profile.output_name}.{output_format.extension}"
+                if os.path.exists(path):
+                    os.remove(path)
+
+        case(
+            f"updateChannelUrlsM3U[x{times}]",
+            lambda: pipeline.updateChannelUrlsM3U(
+                matched, template, url_families, profile, UrlBlacklist(config.url_blacklist)
+            ),
+            remove_outputs,
+            required=False,
+        )
+
+    def fresh_hotel_state():
+        # 每次都从头测速：不恢复检查点，不使用历史记录
+        pipeline.checkpoint = Checkpoint(os.path.join(".cache", "checkpoint.jsonl"), 0)
+        if os.path.exists(config.history_db):
+            os.remove(config.history_db)
+
+    hotel = case("getHotel", pipeline.getHotel, fresh_hotel_state, required=False)
+    if hotel:
+        print(f"酒店组播频道数：{len(hotel) - 1}")
+
+    server.stop()
+    if parse_pool is not None:
+        parse_pool.shutdown()
+    if json_path:
+        with open(json_path, "w", encoding="utf-8") as f:
+            json.dump({"args": vars(args), "results": results}, f, ensure_ascii=False, indent=1)
+    shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
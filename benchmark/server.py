@@ -0,0 +1,152 @@
+import asyncio
+import os
+import re
+import threading
+from string import Template
+
+from aiohttp import web
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+# 酒店组播列表页的频道名称
+HOTEL_CHANNELS = ["CCTV1", "CCTV2", "CCTV5", "CCTV13", "广东卫视", "湖南卫视", "浙江卫视", "东方卫视"]
+
+
+def load_fixture(name):
+    """
+    读取录制的页面，拆成 (页面框架, {区块名: 区块模板})，区块用 <!-- name --> ... <!-- /name --> 标记
+    """
+    with open(os.path.join(FIXTURES, name), "r", encoding="utf-8") as f:
+        page = f.read()
+    blocks = {}
+    for match in re.finditer(r"<!-- (\w+) -->\n(.*?)<!-- /\1 -->\n", page, re.S):
+        blocks[match.group(1)] = Template(match.group(2))
+    return re.sub(r"<!-- (\w+) -->\n.*?<!-- /\1 -->\n", r"$\1", page, flags=re.S), blocks
+
+
+def render_fixture(name, **blocks):
+    page, templates = load_fixture(name)
+    rendered = {
+        block: "".join(templates[block].safe_substitute(values) for values in rows) for block, rows in blocks.items()
+    }
+    return Template(page).safe_substitute(rendered)
+
+
+class BenchmarkServer:
+    """
+    本地替身服务器，在后台线程中运行：
+        /sources/{name}                      直播源内容
+        /iptvsearch/hoteliptv.php           酒店源搜索页（通过 HTTP 代理访问 www.foodieguide.com）
+        /iptvsearch/allllist.php?s=ip:port  酒店频道列表页
+        /stream/{kbps}/{latency}/{n}        按指定带宽（KB/s）和首字节延迟（毫秒）输出的视频流
+        /dead/{n}                           返回 404 的失效地址
+    酒店 IP 使用 127.0.0.2 开始的回环地址，每个地址一个监听端口，另有 dead_hotels 个无法连接的候选
+    """
+
+    def __init__(self, sources, hotels=8, dead_hotels=4, bandwidths=(500, 2000, 8000), latency=50, duration=6):
+        self.sources = sources
+        self.bandwidths = bandwidths
+        self.latency = latency
+        self.duration = duration
+        self.port = None
+        self.hotel_addresses = []
+        self.hotel_count = hotels
+        self.dead_hotels = dead_hotels
+        self.loop = asyncio.new_event_loop()
+        self.runner = None
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self.port}"
+
+    def start(self):
+        ready = threading.Event()
+        threading.Thread(target=self._serve, args=(ready,), daemon=True).start()
+        ready.wait()
+        return self
+
+    def stop(self):
+        asyncio.run_coroutine_threadsafe(self.runner.cleanup(), self.loop).result()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+
+    def _serve(self, ready):
+        asyncio.set_event_loop(self.loop)
+        app = web.Application()
+        app.router.add_get("/sources/{name}", self.source)
+        app.router.add_get("/", self.index)
+        app.router.add_get("/iptvsearch/", self.index)
+        app.router.add_post("/iptvsearch/hoteliptv.php", self.search)
+        app.router.add_get("/iptvsearch/allllist.php", self.hotel_list)
+        app.router.add_get("/stream/{kbps}/{latency}/{n}", self.stream)
+        app.router.add_get("/dead/{n}", self.dead)
+        self.runner = web.AppRunner(app, access_log=None)
+        self.loop.run_until_complete(self.runner.setup())
+        site = web.TCPSite(self.runner, "127.0.0.1", 0)
+        self.loop.run_until_complete(site.start())
+        self.port = self.runner.addresses[-1][1]
+        for index in range(self.hotel_count):
+            site = web.TCPSite(self.runner, f"127.0.0.{index + 2}", 0)
+            self.loop.run_until_complete(site.start())
+            self.hotel_addresses.append(f"127.0.0.{index + 2}:{self.runner.addresses[-1][1]}")
+        ready.set()
+        self.loop.run_forever()
+
+    async def index(self, request):
+        return web.Response(text="<html><body>iptv</body></html>", content_type="text/html")
+
+    async def source(self, request):
+        body = self.sources.get(request.match_info["name"])
+        if body is None:
+            raise web.HTTPNotFound()
+        return web.Response(body=body.encode("utf-8"), content_type="text/plain", charset="utf-8")
+
+    def search_page(self, key):
+        # 端口 1 没有服务监听，连通性检测会失败
+        dead = [f"127.0.1.{index + 1}:1" for index in range(self.dead_hotels)]
+        page = render_fixture(
+            "hoteliptv.html",
+            result=[{"address": address, "key": key} for address in self.hotel_addresses],
+            dead=[{"address": address, "key": key} for address in dead],
+        )
+        return Template(page).safe_substitute(key=key)
+
+    def list_page(self, address):
+        if address not in self.hotel_addresses:
+            return render_fixture("allllist.html", result=[])
+        index = self.hotel_addresses.index(address)
+        kbps = self.bandwidths[index % len(self.bandwidths)]
+        rows = []
+        for number, name in enumerate(HOTEL_CHANNELS * 2, start=1):
+            if index == len(self.hotel_addresses) - 1:
+                url = f"http://{address}/dead/{number}"
+            else:
+                url = f"http://{address}/stream/{kbps}/{self.latency}/{number}"
+            rows.append({"name": f"{name}高清" if number % 2 else name, "url": url})
+        return render_fixture("allllist.html", result=rows)
+
+    async def search(self, request):
+        key = (await request.post()).get("saerch", "")
+        return web.Response(text=self.search_page(key), content_type="text/html")
+
+    async def hotel_list(self, request):
+        return web.Response(text=self.list_page(request.query.get("s", "")), content_type="text/html")
+
+    async def stream(self, request):
+        kbps = int(request.match_info["kbps"])
+        await asyncio.sleep(int(request.match_info["latency"]) / 1000)
+        response = web.StreamResponse(headers={"Content-Type": "video/mp2t"})
+        await response.prepare(request)
+        chunk = b"\x47" * 16 * 1024
+        interval = len(chunk) / 1024 / kbps
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.duration
+        try:
+            while loop.time() < deadline:
+                await response.write(chunk)
+                await asyncio.sleep(interval)
+        except ConnectionResetError:
+            pass
+        return response
+
+    async def dead(self, request):
+        raise web.HTTPNotFound()
@@ -0,0 +1,86 @@
+import ipaddress
+import logging
+import re
+from collections import Counter
+from urllib.parse import urlsplit
+
+SCHEME_RULE = re.compile(r"^[A-Za-z][A-Za-z0-9+.-]*://$")
+
+
+class UrlBlacklist:
+    """
+    启动时预编译的地址黑名单，规则写法：
+        "udp://"           协议，不区分大小写
+        "//host[:port]"    精确匹配主机（可带端口）
+        "1.2.3.0/24"       CIDR 网段，匹配 IP 直连地址
+        其它               子串匹配，所有子串合并为一个正则一次扫描
+    """
+
+    def __init__(self, rules):
+        self.schemes = {}
+        self.hosts = {}
+        self.networks = []
+        substrings = []
+        for rule in rules:
+            if SCHEME_RULE.match(rule):
+                self.schemes.setdefault(rule[:-3].lower(), rule)
+            elif rule.startswith("//"):
+                self.hosts.setdefault(rule[2:].lower(), rule)
+            elif "/" in rule and _parse_network(rule):
+                self.networks.append((_parse_network(rule), rule))
+            else:
+                substrings.append(rule)
+        self.pattern = re.compile("|".join(map(re.escape, substrings))) if substrings else None
+        self.dropped = Counter()
+
+    def match(self, url):
+        """
+        返回命中的规则，未命中返回 None
+        """
+        scheme, sep, _ = url.partition("://")
+        if sep and scheme.lower() in self.schemes:
+            return self.schemes[scheme.lower()]
+        if self.pattern:
+            match = self.pattern.search(url)
+            if match:
+                return match.group(0)
+        if sep and (self.hosts or self.networks):
+            try:
+                parts = urlsplit(url)
+                host, port = parts.hostname, parts.port
+            except ValueError:
+                return None
+            if not host:
+                return None
+            netloc = f"[{host}]" if ":" in host else host
+            if port and f"{netloc}:{port}" in self.hosts:
+                return self.hosts[f"{netloc}:{port}"]
+            if netloc in self.hosts:
+                return self.hosts[netloc]
+            if self.networks:
+                try:
+                    address = ipaddress.ip_address(host)
+                except ValueError:
+                    return None
+                for network, rule in self.networks:
+                    if address in network:
+                        return rule
+        return None
+
+    def is_blocked(self, url):
+        rule = self.match(url)
+        if rule is None:
+            return False
+        self.dropped[rule] += 1
+        return True
+
+    def report(self):
+        for rule, count in self.dropped.most_common():
+            logging.info(f"黑名单规则：{rule} 过滤地址数：{count}")
+
+
+def _parse_network(rule):
+    try:
+        return ipaddress.ip_network(rule, strict=False)
+    except ValueError:
+        return None
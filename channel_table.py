@@ -0,0 +1,83 @@
+from array import array
+from collections import OrderedDict
+
+
+class StringPool:
+    """
+    字符串去重池：相同的字符串只保存一份，用连续的整数编号引用
+    """
+
+    def __init__(self):
+        self.values = []
+        self.ids = {}
+
+    def add(self, value):
+        value_id = self.ids.get(value)
+        if value_id is None:
+            value_id = len(self.values)
+            self.values.append(value)
+            self.ids[value] = value_id
+        return value_id
+
+    def get(self, value):
+        return self.ids.get(value)
+
+    def __getitem__(self, value_id):
+        return self.values[value_id]
+
+    def __len__(self):
+        return len(self.values)
+
+
+class ChannelTable:
+    """
+    所有直播源频道的列式存储：分类、名称、地址各自去重为整数编号，每行只保存四个整数（来源、分类、名称、地址），
+    同一直播源的行连续存放。多个直播源重复出现的名称和地址只占一份内存
+    """
+
+    def __init__(self):
+        self.sources = StringPool()
+        self.categories = StringPool()
+        self.names = StringPool()
+        self.urls = StringPool()
+        self.source_ids = array("I")
+        self.category_ids = array("I")
+        self.name_ids = array("I")
+        self.url_ids = array("I")
+        self.source_rows = {}
+
+    def add_source(self, source, channels):
+        """
+        追加一个直播源的解析结果：分类 -> [(频道名称, 地址)]
+        """
+        source_id = self.sources.add(source)
+        start = len(self.url_ids)
+        for category, channel_list in channels.items():
+            category_id = self.categories.add(category)
+            for channel_name, channel_url in channel_list:
+                self.source_ids.append(source_id)
+                self.category_ids.append(category_id)
+                self.name_ids.append(self.names.add(channel_name))
+                self.url_ids.append(self.urls.add(channel_url))
+        self.source_rows[source_id] = range(start, len(self.url_ids))
+
+    def merged_rows(self, sources):
+        """
+        按给定直播源顺序合并后的行号：分类按首次出现顺序，同一分类内按直播源顺序、源内原顺序
+        """
+        buckets = OrderedDict()
+        for source in sources:
+            source_id = self.sources.get(source)
+            if source_id is None:
+                continue
+            category_ids = self.category_ids
+            for row in self.source_rows[source_id]:
+                bucket = buckets.get(category_ids[row])
+                if bucket is None:
+                    bucket = buckets[category_ids[row]] = array("I")
+                bucket.append(row)
+        for bucket in buckets.values():
+            yield from bucket
+
+    def __len__(self):
+        return len(self.url_ids)
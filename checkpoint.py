@@ -0,0 +1,104 @@
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+
+class Checkpoint:
+    """
+    运行检查点：每完成一项网络工作（直播源获取、IP 连通性检测、频道列表获取、频道测速）立即追加一行记录。
+    上次运行没有正常结束且开始时间在 window 秒内时，本次沿用它的运行 ID 并跳过已完成的工作；
+    正常结束后删除检查点文件。window 为 0 时不恢复
+    """
+
+    def __init__(self, path, window):
+        self.path = path
+        self.lock = threading.Lock()
+        # 从检查点文件载入的记录；本次运行新增的记录只保留键，值已经写入文件，不再占用内存
+        self.records = {}
+        self.recorded = set()
+        self.run_id = None
+        self.resumed = False
+        header = None
+        # 最后一条完整记录的结束位置，以及它是否以换行结尾
+        end = 0
+        newline = True
+        try:
+            with open(path, "rb") as f:
+                line = f.readline()
+                header = json.loads(line)
+                end, newline = len(line), line.endswith(b"\n")
+                if window and time.time() - header["started_at"] < window:
+                    for line in f:
+                        try:
+                            kind, key, value = json.loads(line)
+                        except ValueError:
+                            # 中断时最后一行可能不完整
+                            break
+                        self.records.setdefault(kind, OrderedDict())[key] = value
+                        end, newline = end + len(line), line.endswith(b"\n")
+                    self.run_id = header["run_id"]
+                    self.resumed = True
+        except (OSError, ValueError, KeyError, TypeError):
+            pass
+
+        if self.resumed:
+            count = sum(len(records) for records in self.records.values())
+            logging.info(f"从检查点恢复运行 {self.run_id}，已完成 {count} 项工作")
+            # 去掉不完整的最后一行，新记录从完整的一行之后开始追加
+            with open(path, "r+b") as f:
+                f.truncate(end)
+            self.file = open(path, "a", encoding="utf-8")
+            if not newline:
+                self.file.write("\n")
+                self.file.flush()
+        else:
+            self.run_id = uuid.uuid4().hex[:12]
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            self.file = open(path, "w", encoding="utf-8")
+            self._write({"run_id": self.run_id, "started_at": time.time()})
+            logging.info(f"开始运行 {self.run_id}")
+
+    def _write(self, data):
+        self.file.write(json.dumps(data, ensure_ascii=False) + "\n")
+        self.file.flush()
+
+    def get(self, kind, key, default=None):
+        """
+        读取从检查点文件载入的记录
+        """
+        with self.lock:
+            return self.records.get(kind, {}).get(key, default)
+
+    def has(self, kind, key):
+        with self.lock:
+            return key in self.records.get(kind, {}) or (kind, key) in self.recorded
+
+    def items(self, kind):
+        with self.lock:
+            return list(self.records.get(kind, {}).items())
+
+    def record(self, kind, key, value):
+        """
+        保存一项已完成的工作，可以在多个线程中调用。值只写入文件，本次运行中 get 读不到
+        """
+        with self.lock:
+            self.recorded.add((kind, key))
+            try:
+                self._write([kind, key, value])
+            except (OSError, ValueError) as e:
+                logging.error(f"写入检查点失败❌, Error: {e}")
+
+    def finish(self):
+        """
+        本次运行正常结束，删除检查点
+        """
+        with self.lock:
+            self.file.close()
+            try:
+                os.remove(self.path)
+            except OSError:
+                pass
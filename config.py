@@ -1,3 +1,11 @@
+# 一次运行依次生成的输出配置，直播源合并后只获取一次
+profiles = ["config", "config2"]
+
+output_name = "live"
+# 输出格式：m3u、txt、json，加 .gz 后缀为 gzip 压缩版本，例如 "m3u.gz"
+output_formats = ["m3u", "txt"]
+template_file = "demo.txt"
+
 ip_version_priority = ""
 
 source_urls = [
@@ -14,6 +22,7 @@ source_urls = [
     "https://raw.githubusercontent.com/kimwang1978/collect-tv-txt/main/merged_output.txt"
 ]
 
+# 黑名单规则："udp://" 按协议，"//host[:port]" 精确匹配主机，"1.2.3.0/24" 按网段，其它按子串匹配
 url_blacklist = [
     "epg.pw/stream/",
     "103.40.13.71:12390",
@@ -56,3 +65,96 @@ epg_urls = [
     "https://epg.pw/xmltv/epg_HK.xml",
     "https://epg.pw/xmltv/epg_TW.xml"
 ]
+
+# 直播源并发获取：线程数、单个源超时（秒）、全部源总时限（秒）
+fetch_workers = 8
+fetch_timeout = 30
+fetch_deadline = 180
+
+# 直播源解析进程池：是否开启、进程数（0 表示按 CPU 核数）、使用进程池的最小文件大小（字节），较小的直播源在获取线程中解析。
+# "auto" 表示多核机器上（如 GitHub Actions 的 ubuntu-latest）、且有需要解析的直播源上次大小不小于 parse_pool_min_bytes 时开启；
+# 单核机器上进程间传递结果的开销大于并行解析的收益，不开启
+parse_pool = "auto"
+parse_workers = 0
+parse_pool_min_bytes = 256 * 1024
+
+# 直播源磁盘缓存：目录、总大小上限（字节）、无校验信息时的有效期（秒）
+http_cache_dir = ".cache/http"
+http_cache_max_bytes = 64 * 1024 * 1024
+http_cache_max_age = 1800
+
+# IPv4/IPv6 判断：是否解析域名（只有 AAAA 记录的按 IPv6），解析线程数、总时限（秒）
+dns_resolve = True
+dns_workers = 32
+dns_deadline = 30
+
+# 酒店组播测速：引擎（asyncio 或 thread）、全局并发数、单个 IP 并发数、确定可用的速度（MB/s），达到后提前停止测速
+hotel_speed_engine = "asyncio"
+hotel_speed_workers = 100
+hotel_speed_per_host = 5
+hotel_good_speed = 1.0
+
+# 酒店组播 IP 连通性检测：单个连接超时（秒）、全部检测总时限（秒）、并发数
+hotel_probe_timeout = 5
+hotel_probe_deadline = 20
+hotel_probe_concurrency = 200
+
+# 酒店组播流水线：获取频道列表的线程数、阶段之间队列的最大长度
+hotel_list_workers = 8
+hotel_queue_size = 16
+
+# 酒店源网站请求限速（按主机）：每秒请求数、可突发请求数、初始并发窗口、最大并发窗口，
+# 429/5xx 和连接失败的重试次数、退避基数（秒）、最长退避（秒）、单次请求超时（秒）
+hotel_request_rate = 2.0
+hotel_request_burst = 4
+hotel_request_window = 2
+hotel_request_max_window = 8
+hotel_request_retries = 3
+hotel_request_backoff = 1.0
+hotel_request_max_backoff = 30.0
+hotel_request_timeout = 15
+
+# 测速历史记录：数据库路径、得分衰减半衰期（秒）、记录保留时长（秒）
+history_db = ".cache/history.sqlite3"
+history_half_life = 24 * 3600
+history_retention = 7 * 24 * 3600
+# 历史得分高于该速度（MB/s）的 IP 直接加入候选，不再检测连通性
+history_min_speed = 0.5
+# 最近 max_age 秒内测过、至少 min_runs 次且波动系数不超过 max_variation 的 IP 跳过测速
+history_max_age = 6 * 3600
+history_min_runs = 3
+history_max_variation = 0.3
+
+# 频道地址检测：是否开启、并发数、单个主机并发数、单次请求超时（秒）、总时限（秒）、
+# 每个 m3u8 下载的分片数（0 表示只检查播放列表，大于 0 时按实时播放比和下载速度排序）
+health_check = True
+health_workers = 200
+health_per_host = 4
+health_timeout = 5
+health_budget = 300
+health_segments = 0
+
+# 酒店组播测速的 HLS 探测：每个 m3u8 下载的分片数（0 表示只检查播放列表），实时播放比低于该值的记为 0
+hls_segments = 2
+hls_min_ratio = 1.0
+
+# 模板编译缓存目录：模板文件没有变化时直接读取编译结果
+template_cache_dir = ".cache/templates"
+
+# 频道名称匹配：是否在精确匹配之外比较规范化名称（全角半角、画质标记、标点、前导零），
+# 模糊匹配的最低相似度（0~1，None 表示关闭模糊匹配）
+name_normalize = True
+name_fuzzy_threshold = 0.85
+
+# 运行检查点：已完成的网络工作随时写入，中断后在 window 秒内重新运行时跳过这些工作（0 表示不恢复）
+checkpoint_path = ".cache/checkpoint.jsonl"
+checkpoint_window = 3600
+
+# 运行指标报告：JSON 报告路径，Prometheus 文本格式路径（None 表示不生成）
+metrics_report = "report/metrics.json"
+metrics_prometheus = "report/metrics.prom"
+
+# 增量生成：输入没有变化时跳过匹配、检测和写入；状态文件路径；超过该时长（秒）强制完整生成一次
+incremental = True
+incremental_state = ".cache/state.json"
+incremental_max_age = 24 * 3600
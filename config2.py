@@ -1,10 +1,17 @@
+# 输出配置：只包含本组输出相关的设置，抓取、检测等全局设置见 config.py
+output_name = "live2"
+# 输出格式：m3u、txt、json，加 .gz 后缀为 gzip 压缩版本，例如 "m3u.gz"
+output_formats = ["m3u", "txt"]
+template_file = "demo.txt"
+
 ip_version_priority = "ipv6"
 
 source_urls = [
     "https://raw.githubusercontent.com/fanmingming/live/main/tv/m3u/ipv6.m3u",
-    "https://raw.githubusercontent.com/Wirili/IPTV/refs/heads/main/hotel.m3u"
+    "hotel.m3u"
 ]
 
+# 黑名单规则："udp://" 按协议，"//host[:port]" 精确匹配主机，"1.2.3.0/24" 按网段，其它按子串匹配
 url_blacklist = [
     "epg.pw/stream/",
     "103.40.13.71:12390",
@@ -0,0 +1,111 @@
+import asyncio
+import errno
+import logging
+import time
+from collections import OrderedDict, namedtuple
+from types import SimpleNamespace
+
+import aiohttp
+
+import metrics
+from hls import MAX_PLAYLIST_BYTES, is_playlist, probe_playlist, read_limited
+from speedtest import create_async_session
+
+# 检测结果：是否可用、响应耗时（秒）、分片下载速度（MB/s）、实时播放比，未采样分片时后两项为 None
+HealthResult = namedtuple("HealthResult", ["alive", "latency", "throughput", "ratio"])
+DEAD = HealthResult(False, None, None, None)
+# 本机没有到目标网络的路由（如运行环境没有 IPv6）：无法判断地址是否可用，按未检测处理
+UNREACHABLE = HealthResult(None, None, None, None)
+UNREACHABLE_ERRNOS = {errno.ENETUNREACH, errno.EHOSTUNREACH, errno.EADDRNOTAVAIL, errno.EAFNOSUPPORT}
+
+
+async def check_stream(session, url, segment_count=0):
+    """
+    检测单个地址：连通并返回数据；HLS 地址跟随子码流解析到媒体播放列表，要求至少有一个分片，
+    segment_count 大于 0 时下载最后几个分片，计算下载速度和实时播放比
+    """
+    try:
+        trace = SimpleNamespace(sent=time.monotonic(), connect=0)
+        async with session.get(url, trace_request_ctx=trace) as response:
+            response.raise_for_status()
+            latency = round(time.monotonic() - trace.sent, 4)
+            head = await response.content.read(64 * 1024)
+            if not head:
+                return DEAD
+            if not is_playlist(url, response.headers.get("Content-Type"), head):
+                return HealthResult(True, latency, None, None)
+            text = (head + await read_limited(response, MAX_PLAYLIST_BYTES)).decode("utf-8", "ignore")
+            base_url = str(response.url)
+        result = await probe_playlist(session, text, base_url, segment_count)
+        if result is None:
+            return DEAD
+        return HealthResult(True, latency, result.rate, result.ratio)
+    except aiohttp.ClientConnectorError as e:
+        return UNREACHABLE if e.errno in UNREACHABLE_ERRNOS else DEAD
+    except (aiohttp.ClientError, asyncio.TimeoutError, ValueError):
+        return DEAD
+
+
+async def _check_all(urls, workers, per_host, timeout, budget, segment_count):
+    if not urls:
+        return {}
+    async with create_async_session(workers, per_host, timeout) as session:
+        tasks = OrderedDict(
+            (url, asyncio.ensure_future(check_stream(session, url.split("$", 1)[0], segment_count)))
+            for url in urls
+        )
+        done, pending = await asyncio.wait(tasks.values(), timeout=budget)
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+        if pending:
+            logging.info(f"频道检测超出总时限 {budget}s，未完成 {len(pending)} 个，保留原顺序")
+        return {url: task.result() for url, task in tasks.items() if task in done}
+
+
+def check_channels(
+    channels, skip=None, results=None, workers=200, per_host=4, timeout=5, budget=300, segment_count=0
+):
+    """
+    检测所有匹配到的频道地址：删除不可用的地址，可用地址按实时播放比、分片速度从高到低，响应耗时从低到高排序，
+    未检测的地址（非 http、超出总时限、本机网络不可达）保留原顺序排在最后。skip(url) 为真的地址不检测；
+    results 为多次调用共享的检测结果，已有结果的地址不再重复检测
+    """
+    urls = OrderedDict.fromkeys(
+        url
+        for channel_map in channels.values()
+        for url_list in channel_map.values()
+        for url in url_list
+        if url.partition("://")[0].lower() in ("http", "https") and not (skip and skip(url))
+    )
+    if results is None:
+        results = {}
+    pending = [url for url in urls if url not in results]
+    results.update(asyncio.run(_check_all(pending, workers, per_host, timeout, budget, segment_count)))
+    unreachable = len([url for url in urls if results.get(url) is UNREACHABLE])
+    results = {url: results[url] for url in urls if url in results and results[url] is not UNREACHABLE}
+    alive = len([result for result in results.values() if result.alive])
+    for result in results.values():
+        metrics.count("health_checks", result="alive" if result.alive else "dead")
+        if result.alive:
+            metrics.observe("request_seconds", result.latency, kind="health", status="ok")
+    metrics.count("health_checks", len(urls) - len(results), result="unchecked")
+    logging.info(f"频道检测完成✅，待检测地址：{len(urls)}，已检测：{len(results)}，可用：{alive}")
+    if unreachable:
+        logging.info(f"频道检测：{unreachable} 个地址本机网络不可达（如没有 IPv6 路由），保留原顺序")
+    if results and not alive:
+        logging.error("频道检测没有任何可用地址❌，保留原始结果")
+        return channels
+
+    checked = OrderedDict()
+    for category, channel_map in channels.items():
+        checked[category] = OrderedDict()
+        for channel_name, url_list in channel_map.items():
+            measured = [url for url in url_list if url in results and results[url].alive]
+            measured.sort(
+                key=lambda url: (-(results[url].ratio or 0), -(results[url].throughput or 0), results[url].latency)
+            )
+            unknown = [url for url in url_list if url not in results]
+            if measured or unknown:
+                checked[category][channel_name] = measured + unknown
+    return checked
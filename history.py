@@ -0,0 +1,96 @@
+import math
+import os
+import sqlite3
+import time
+from collections import OrderedDict
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS samples (
+    host TEXT NOT NULL,
+    url TEXT NOT NULL,
+    ts REAL NOT NULL,
+    throughput REAL NOT NULL,
+    latency REAL,
+    ok INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS samples_host ON samples (host, ts);
+CREATE TABLE IF NOT EXISTS results (
+    host TEXT NOT NULL,
+    ts REAL NOT NULL,
+    speed REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS results_host ON results (host, ts);
+"""
+
+
+class HistoryStore:
+    """
+    测速历史记录（SQLite）：
+        samples  每个频道地址的测速样本（速度、首字节时间、是否成功）
+        results  每个 IP 每次运行的测速结果，用于计算按时间衰减的得分
+    """
+
+    def __init__(self, path, half_life, retention):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.half_life = half_life
+        self.retention = retention
+        self.conn = sqlite3.connect(path)
+        self.conn.executescript(SCHEMA)
+
+    def record_sample(self, host, url, sample):
+        self.conn.execute(
+            "INSERT INTO samples VALUES (?, ?, ?, ?, ?, ?)",
+            (host, url, time.time(), sample.rate, sample.ttfb, int(sample.rate > 0)),
+        )
+
+    def record_result(self, host, speed):
+        self.conn.execute("INSERT INTO results VALUES (?, ?, ?)", (host, time.time(), speed))
+
+    def close(self):
+        """
+        清理超出保留期的记录并写入磁盘
+        """
+        cutoff = time.time() - self.retention
+        self.conn.execute("DELETE FROM samples WHERE ts < ?", (cutoff,))
+        self.conn.execute("DELETE FROM results WHERE ts < ?", (cutoff,))
+        self.conn.commit()
+        self.conn.close()
+
+    def scores(self):
+        """
+        每个 IP 的 (衰减得分, 最近测速时间, 测速次数, 波动系数)，越新的结果权重越大
+        """
+        now = time.time()
+        rows = OrderedDict()
+        for host, ts, speed in self.conn.execute("SELECT host, ts, speed FROM results ORDER BY ts"):
+            rows.setdefault(host, []).append((ts, speed))
+
+        scores = OrderedDict()
+        for host, results in rows.items():
+            weights = [0.5 ** ((now - ts) / self.half_life) for ts, _ in results]
+            total = sum(weights)
+            mean = sum(w * speed for w, (_, speed) in zip(weights, results)) / total
+            variance = sum(w * (speed - mean) ** 2 for w, (_, speed) in zip(weights, results)) / total
+            variation = math.sqrt(variance) / mean if mean > 0 else 0
+            scores[host] = (round(mean, 4), results[-1][0], len(results), variation)
+        return scores
+
+    def good_hosts(self, min_speed):
+        """
+        得分高于 min_speed 的 IP，按得分从高到低排序
+        """
+        scores = self.scores()
+        hosts = [host for host, (score, _, _, _) in scores.items() if score > min_speed]
+        return sorted(hosts, key=lambda host: scores[host][0], reverse=True)
+
+    def stable_hosts(self, max_age, min_runs, max_variation):
+        """
+        最近 max_age 秒内测过、至少测过 min_runs 次且波动不超过 max_variation 的 IP，
+        可以直接使用历史得分，跳过本次测速。返回 IP -> 得分
+        """
+        now = time.time()
+        return OrderedDict(
+            (host, score)
+            for host, (score, last_ts, runs, variation) in self.scores().items()
+            if now - last_ts < max_age and runs >= min_runs and variation <= max_variation
+        )
@@ -0,0 +1,117 @@
+import time
+from collections import namedtuple
+from types import SimpleNamespace
+from urllib.parse import urljoin
+
+# HLS 探测结果：实时播放比（分片时长/下载耗时）、分片下载速度（MB/s）、下载的分片总时长（秒）
+HlsResult = namedtuple("HlsResult", ["ratio", "rate", "duration"])
+
+MAX_PLAYLIST_BYTES = 512 * 1024
+MAX_SEGMENT_BYTES = 16 * 1024 * 1024
+
+
+def is_playlist(url, content_type, head):
+    """
+    根据地址后缀、Content-Type 或内容开头判断是否为 HLS 播放列表
+    """
+    return (
+        ".m3u8" in url.split("?", 1)[0].lower()
+        or "mpegurl" in (content_type or "").lower()
+        or head.lstrip().startswith(b"#EXTM3U")
+    )
+
+
+def parse_playlist(text, base_url):
+    """
+    解析 HLS 播放列表，返回 (子码流列表 [(带宽, 地址)], 分片列表 [(时长, 地址)])
+    """
+    variants = []
+    segments = []
+    bandwidth = None
+    duration = None
+    for line in text.splitlines():
+        line = line.strip()
+        if line.startswith("#EXT-X-STREAM-INF"):
+            bandwidth = 0
+            for attr in line.split(":", 1)[-1].split(","):
+                key, _, value = attr.partition("=")
+                if key.strip() == "BANDWIDTH" and value.strip().isdigit():
+                    bandwidth = int(value)
+        elif line.startswith("#EXTINF"):
+            try:
+                duration = float(line.split(":", 1)[1].split(",", 1)[0])
+            except (IndexError, ValueError):
+                duration = 0
+        elif line and not line.startswith("#"):
+            if bandwidth is not None:
+                variants.append((bandwidth, urljoin(base_url, line)))
+                bandwidth = None
+            else:
+                segments.append((duration or 0, urljoin(base_url, line)))
+                duration = None
+    return variants, segments
+
+
+async def read_limited(response, limit):
+    """
+    读取响应内容，最多 limit 字节
+    """
+    data = bytearray()
+    while len(data) < limit:
+        chunk = await response.content.read(limit - len(data))
+        if not chunk:
+            break
+        data += chunk
+    return bytes(data)
+
+
+async def fetch_playlist(session, url):
+    """
+    下载播放列表，返回 (内容, 最终地址, 请求跟踪信息)，跟踪信息中 ttfb 为首字节时间
+    """
+    trace = SimpleNamespace(sent=time.monotonic(), connect=0, ttfb=None)
+    async with session.get(url, trace_request_ctx=trace) as response:
+        response.raise_for_status()
+        trace.ttfb = time.monotonic() - trace.sent
+        text = (await read_limited(response, MAX_PLAYLIST_BYTES)).decode("utf-8", "ignore")
+        return text, str(response.url), trace
+
+
+async def probe_playlist(session, text, base_url, segment_count=2, max_depth=2):
+    """
+    从主播放列表跟随带宽最高的子码流找到媒体播放列表，下载最后 segment_count 个分片，
+    用分片标称时长除以下载耗时得到实时播放比（>= 1 表示可以实时播放）。
+    没有分片时返回 None；segment_count 为 0 时只确认分片存在
+    """
+    variants, segments = parse_playlist(text, base_url)
+    for _ in range(max_depth):
+        if not variants:
+            break
+        text, base_url, _ = await fetch_playlist(session, max(variants)[1])
+        variants, segments = parse_playlist(text, base_url)
+    if not segments:
+        return None
+    if not segment_count:
+        return HlsResult(None, None, 0)
+
+    size = 0
+    duration = 0
+    start_time = time.monotonic()
+    for segment_duration, segment_url in segments[-segment_count:]:
+        async with session.get(segment_url) as response:
+            response.raise_for_status()
+            size += len(await read_limited(response, MAX_SEGMENT_BYTES))
+        duration += segment_duration
+    download_time = max(time.monotonic() - start_time, 1e-6)
+    if not size:
+        return None
+    ratio = round(duration / download_time, 4) if duration else None
+    return HlsResult(ratio, round(size / download_time / 1024 / 1024, 4), duration)
+
+
+async def probe_hls(session, url, segment_count=2):
+    """
+    HLS 探测：下载播放列表并测量分片，返回 (HlsResult 或 None, 请求跟踪信息)
+    """
+    text, base_url, trace = await fetch_playlist(session, url)
+    return await probe_playlist(session, text, base_url, segment_count), trace
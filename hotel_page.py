@@ -0,0 +1,57 @@
+from lxml import etree
+
+# 搜索页面上可用的 IP 用绿色“存活”标记，IP 在标记的祖父元素中的第一个链接里
+_ALIVE = etree.XPath('//div[@style="color:limegreen; "]')
+_FIRST_LINK = etree.XPath("(.//a)[1]")
+# 列表页面每个频道的地址在 div.m3u8 中，频道名称在同一父元素下的第一个 .channel 中
+_M3U8 = etree.XPath('//div[contains(concat(" ", normalize-space(@class), " "), " m3u8 ")]')
+_FIRST_CHANNEL = etree.XPath('(.//*[contains(concat(" ", normalize-space(@class), " "), " channel ")])[1]')
+_TEXT = etree.XPath("string()")
+
+
+def _parse(text):
+    # etree.HTML 使用 lxml 每个线程各自的默认解析器，多个线程可以同时解析
+    if not text or not text.strip():
+        return None
+    return etree.HTML(text)
+
+
+def _first_text(xpath, element):
+    """
+    element 下 xpath 匹配的第一个元素的文本，元素不存在时返回 None
+    """
+    if element is None:
+        return None
+    found = xpath(element)
+    return _TEXT(found[0]).strip() if found else None
+
+
+def parse_search_page(text):
+    """
+    酒店源搜索页面中标记为可用的 ip:port，按页面顺序
+    """
+    root = _parse(text)
+    if root is None:
+        return []
+    result = []
+    for item in _ALIVE(root):
+        parent = item.getparent()
+        address = _first_text(_FIRST_LINK, parent.getparent() if parent is not None else None)
+        if address is not None:
+            result.append(address)
+    return result
+
+
+def parse_list_page(text):
+    """
+    酒店频道列表页面中的 (频道名称, 地址)，按页面顺序
+    """
+    root = _parse(text)
+    if root is None:
+        return []
+    result = []
+    for item in _M3U8(root):
+        name = _first_text(_FIRST_CHANNEL, item.getparent())
+        if name is not None:
+            result.append((name, _TEXT(item).strip()))
+    return result
@@ -0,0 +1,139 @@
+import hashlib
+import json
+import logging
+import os
+import time
+from collections import OrderedDict
+
+from incremental import atomic_write
+
+
+class HttpCache:
+    """
+    直播源磁盘缓存：保存响应内容、ETag/Last-Modified 校验信息以及解析后的频道
+    """
+
+    def __init__(self, directory, max_bytes, max_age):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, url, suffix):
+        key = hashlib.sha1(url.encode("utf-8")).hexdigest()
+        return os.path.join(self.directory, f"{key}.{suffix}")
+
+    def get(self, url):
+        """
+        读取缓存条目，不存在或已损坏时返回 None
+        """
+        try:
+            with open(self._path(url, "json"), "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if entry.get("url") != url or not os.path.exists(self._path(url, "channels")):
+            return None
+        return entry
+
+    def is_fresh(self, entry):
+        """
+        没有校验信息的条目，在 max_age 内直接复用，不再请求
+        """
+        if entry.get("etag") or entry.get("last_modified"):
+            return False
+        return time.time() - entry["stored_at"] < self.max_age
+
+    def body_size(self, url):
+        """
+        上次下载的响应内容大小（字节），没有缓存时返回 None
+        """
+        try:
+            return os.path.getsize(self._path(url, "body"))
+        except OSError:
+            return None
+
+    def conditional_headers(self, entry):
+        headers = {}
+        if entry:
+            if entry.get("etag"):
+                headers["If-None-Match"] = entry["etag"]
+            if entry.get("last_modified"):
+                headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def load_channels(self, entry):
+        url = entry["url"]
+        now = time.time()
+        for suffix in ("json", "body", "channels"):
+            try:
+                os.utime(self._path(url, suffix), (now, now))
+            except OSError:
+                pass
+        with open(self._path(url, "channels"), "r", encoding="utf-8") as f:
+            return OrderedDict(
+                (category, [tuple(item) for item in channel_list])
+                for category, channel_list in json.load(f)
+            )
+
+    def save_body(self, url, lines):
+        """
+        逐行把响应内容写入缓存文件，不在内存中保留整个响应，返回文件路径
+        """
+        path = self._path(url, "body")
+        tmp_path = f"{path}.tmp{os.getpid()}"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                for line in lines:
+                    f.write(f"{line}\n")
+            os.replace(tmp_path, path)
+        except BaseException:
+            # 下载中断时不留下临时文件
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        return path
+
+    def store(self, url, response, channels):
+        """
+        保存校验信息和解析结果，响应内容由 save_body 写入
+        """
+        try:
+            atomic_write(self._path(url, "channels"), json.dumps(list(channels.items()), ensure_ascii=False))
+            entry = {
+                "url": url,
+                "etag": response.headers.get("ETag"),
+                "last_modified": response.headers.get("Last-Modified"),
+                "stored_at": time.time(),
+            }
+            atomic_write(self._path(url, "json"), json.dumps(entry))
+        except OSError as e:
+            logging.error(f"url: {url} 写入缓存失败❌, Error: {e}")
+
+    def evict(self):
+        """
+        缓存总大小超过 max_bytes 时，按最近使用时间淘汰最旧的条目
+        """
+        entries = {}
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                # 超出总时限后仍在运行的获取线程可能刚刚替换或删除了临时文件
+                continue
+            key = name.split(".", 1)[0]
+            paths, size, used = entries.get(key, ([], 0, 0))
+            entries[key] = (paths + [path], size + stat.st_size, max(used, stat.st_mtime))
+
+        total = sum(size for _, size, _ in entries.values())
+        for key, (paths, size, _) in sorted(entries.items(), key=lambda t: t[1][2]):
+            if total <= self.max_bytes:
+                break
+            for path in paths:
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+            total -= size
+            logging.info(f"缓存超出 {self.max_bytes} 字节，淘汰条目：{key}")
@@ -0,0 +1,137 @@
+import logging
+import random
+import threading
+import time
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+import metrics
+
+
+def create_session(pool_size=16):
+    """
+    创建共享连接池的 Session，复用 keep-alive 连接
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+class HostLimiter:
+    """
+    单个主机的请求节奏：令牌桶限制每秒请求数（rate，可突发 burst 个），
+    并发窗口按 AIMD 调整：请求成功窗口加 1/窗口，被限流或服务端出错时窗口减半
+    """
+
+    def __init__(self, rate, burst, window, max_window):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated_at = time.monotonic()
+        self.window = window
+        self.max_window = max_window
+        self.in_flight = 0
+        self.condition = threading.Condition()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def acquire(self):
+        """
+        等待并发窗口有空位并取得一个令牌
+        """
+        with self.condition:
+            while True:
+                self._refill()
+                if self.in_flight < int(self.window):
+                    if self.tokens >= 1:
+                        self.tokens -= 1
+                        self.in_flight += 1
+                        return
+                    self.condition.wait((1 - self.tokens) / self.rate)
+                else:
+                    self.condition.wait()
+
+    def release(self, ok):
+        with self.condition:
+            self.in_flight -= 1
+            if ok:
+                self.window = min(self.max_window, self.window + 1 / self.window)
+            else:
+                self.window = max(1, self.window / 2)
+            self.condition.notify_all()
+
+
+class HostScheduler:
+    """
+    按主机限速的请求调度：所有请求共用一个连接池 Session，每个主机一个 HostLimiter；
+    429 和 5xx 响应以及连接失败按指数退避加随机抖动重试，Retry-After 优先
+    """
+
+    def __init__(
+        self, session, rate, burst, window, max_window, retries=3, backoff=1.0, max_backoff=30.0, timeout=15
+    ):
+        self.session = session
+        self.rate = rate
+        self.burst = burst
+        self.window = window
+        self.max_window = max_window
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.timeout = timeout
+        self.limiters = {}
+        self.lock = threading.Lock()
+
+    def limiter(self, host):
+        with self.lock:
+            limiter = self.limiters.get(host)
+            if limiter is None:
+                limiter = self.limiters[host] = HostLimiter(self.rate, self.burst, self.window, self.max_window)
+            return limiter
+
+    def _delay(self, attempt, response):
+        retry_after = response.headers.get("Retry-After") if response is not None else None
+        if retry_after and retry_after.isdigit():
+            return min(self.max_backoff, int(retry_after))
+        # full jitter：在 [0, backoff * 2^attempt] 中随机等待，避免多个线程同时重试
+        return random.uniform(0, min(self.max_backoff, self.backoff * 2**attempt))
+
+    def request(self, method, url, **kwargs):
+        host = urlsplit(url).hostname
+        limiter = self.limiter(host)
+        kwargs.setdefault("timeout", self.timeout)
+        for attempt in range(self.retries + 1):
+            response = None
+            error = None
+            limiter.acquire()
+            try:
+                response = self.session.request(method, url, **kwargs)
+            except requests.RequestException as e:
+                error = e
+            throttled = error is not None or response.status_code == 429 or response.status_code >= 500
+            limiter.release(not throttled)
+            if not throttled:
+                return response
+            status = response.status_code if response is not None else type(error).__name__
+            metrics.count("rate_limited", host=host, status=status)
+            if attempt == self.retries:
+                break
+            delay = self._delay(attempt, response)
+            logging.info(f"url：{url} 返回 {status}，{delay:.1f}s 后重试（并发窗口 {int(limiter.window)}）")
+            time.sleep(delay)
+        if error is not None:
+            raise error
+        return response
+
+    def get(self, url, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request("POST", url, **kwargs)
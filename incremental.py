@@ -0,0 +1,67 @@
+import hashlib
+import json
+import logging
+import os
+
+
+def fingerprint(*parts):
+    """
+    计算任意可 JSON 序列化内容的指纹
+    """
+    data = json.dumps(parts, ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha1(data.encode("utf-8")).hexdigest()
+
+
+def atomic_write(path, data):
+    """
+    先写临时文件再重命名，写入过程中被中断也不会留下不完整的文件。data 可以是文本或字节
+    """
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    tmp_path = f"{path}.tmp{os.getpid()}"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+def write_if_changed(path, data):
+    """
+    内容与现有文件相同时不写入，返回是否写入
+    """
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    try:
+        with open(path, "rb") as f:
+            if f.read() == data:
+                return False
+    except OSError:
+        pass
+    atomic_write(path, data)
+    return True
+
+
+class BuildState:
+    """
+    上次生成的状态：每组输出的输入指纹、生成时间、各分类块的指纹
+    """
+
+    def __init__(self, path):
+        self.path = path
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                self.state = json.load(f)
+        except (OSError, ValueError):
+            self.state = {}
+
+    def get(self, name):
+        return self.state.get(name)
+
+    def set(self, name, value):
+        self.state[name] = value
+
+    def save(self):
+        try:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            atomic_write(self.path, json.dumps(self.state, ensure_ascii=False))
+        except OSError as e:
+            logging.error(f"保存生成状态失败❌, Error: {e}")
@@ -1,13 +1,31 @@
-import re
+import importlib
+import os
+import sys
 import time
 import requests
 import logging
-from collections import OrderedDict
+from collections import Counter, OrderedDict
 from datetime import datetime
 import config
-from bs4 import BeautifulSoup
-import socket
-from concurrent.futures import ThreadPoolExecutor, as_completed
+import metrics
+from queue import Queue
+from address import IPV6, classify_urls
+from blacklist import UrlBlacklist
+from checkpoint import Checkpoint
+from channel_table import ChannelTable
+from health import check_channels
+from history import HistoryStore
+from hotel_page import parse_list_page, parse_search_page
+from http_client import HostScheduler, create_session
+from http_cache import HttpCache
+from incremental import BuildState, atomic_write, fingerprint, write_if_changed
+from matcher import EXACT, NORMALIZED, NameResolver, build_channel_index, merge_hits
+from pipeline import DONE, iter_queue, iter_queue_until, start_producer, start_stage
+from playlist import create_parse_pool, parse_file, parse_playlist, to_channels
+from probe import probe_reachable
+from speedtest import SAMPLE_SIZE, run_async_speed_tests, run_speed_tests
+from template import TemplateCache
+from writer import FORMAT_VERSION, create_formats
 
 logging.basicConfig(
     level=logging.INFO,
@@ -15,362 +33,614 @@ logging.basicConfig(
     handlers=[logging.FileHandler("function.log", "w", encoding="utf-8"), logging.StreamHandler()],
 )
 
-
-def parse_template(template_file):
-    template_channels = OrderedDict()
-    current_category = None
-
-    with open(template_file, "r", encoding="utf-8") as f:
-        for line in f:
-            line = line.strip()
-            if line and not line.startswith("#"):
-                if "#genre#" in line:
-                    current_category = line.split(",")[0].strip()
-                    template_channels[current_category] = []
-                elif current_category:
-                    channel_name = line.split(",")[0].strip()
-                    template_channels[current_category].append(channel_name)
-
-    return template_channels
+# 酒店组播直播源，以及它写出的本地文件
+HOTEL_SOURCE = "酒店组播"
+HOTEL_FILES = ("hotel.m3u", "hotel.txt")
+
+http_cache = HttpCache(config.http_cache_dir, config.http_cache_max_bytes, config.http_cache_max_age)
+template_cache = TemplateCache(config.template_cache_dir)
+checkpoint = Checkpoint(config.checkpoint_path, config.checkpoint_window)
+hotel_client = HostScheduler(
+    create_session(config.hotel_request_max_window),
+    rate=config.hotel_request_rate,
+    burst=config.hotel_request_burst,
+    window=config.hotel_request_window,
+    max_window=config.hotel_request_max_window,
+    retries=config.hotel_request_retries,
+    backoff=config.hotel_request_backoff,
+    max_backoff=config.hotel_request_max_backoff,
+    timeout=config.hotel_request_timeout,
+)
 
 
-def fetch_channels(url):
+@metrics.timed("stage_seconds", stage="fetch_source")
+def fetch_channels(url, session=None, parse_pool=None, deadline=None):
+    """
+    获取并解析一个直播源。deadline 为 time.monotonic() 的截止时刻，超过后中断下载，
+    持续缓慢输出的直播源也不会拖过总时限
+    """
     channels = OrderedDict()
 
     try:
-        lines = ""
-        if url == "酒店组播":
-            lines = getHotel()
-        else:
-            response = requests.get(url)
-            response.raise_for_status()
-            response.encoding = "utf-8"
-            lines = response.text.split("\n")
-        current_category = None
-        is_m3u = any("#EXTINF" in line for line in lines[:15])
-        source_type = "m3u" if is_m3u else "txt"
-        logging.info(f"url: {url} 获取成功，判断为{source_type}格式")
-
-        if is_m3u:
-            for line in lines:
-                line = line.strip()
-                if line.startswith("#EXTINF"):
-                    match = re.search(r'group-title="(.*?)",(.*)', line)
-                    if match:
-                        current_category = match.group(1).strip()
-                        channel_name = match.group(2).strip()
-                        if current_category not in channels:
-                            channels[current_category] = []
-                elif line and not line.startswith("#"):
-                    channel_url = line.strip()
-                    if current_category and channel_name:
-                        channels[current_category].append((channel_name, channel_url))
+        if url == HOTEL_SOURCE:
+            channels = collect_channels(url, parse_playlist(getHotel()))
+        elif "://" not in url:
+            channels = collect_channels(url, parse_source(url, parse_pool))
         else:
-            for line in lines:
-                line = line.strip()
-                if "#genre#" in line:
-                    current_category = line.split(",")[0].strip()
-                    channels[current_category] = []
-                elif current_category:
-                    match = re.match(r"^(.*?),(.*?)$", line)
-                    if match:
-                        channel_name = match.group(1).strip()
-                        channel_url = match.group(2).strip()
-                        for item in channel_url.split("#"):
-                            channels[current_category].append((channel_name, item))
-                    elif line:
-                        channels[current_category].append((line, ""))
-        if channels:
-            categories = ", ".join(channels.keys())
-            logging.info(
-                f"url: {url} 爬取成功✅，包含频道数：{len(lines)} 包含频道分类: {categories}"
-            )
-    except requests.RequestException as e:
+            entry = http_cache.get(url)
+            if entry and http_cache.is_fresh(entry):
+                logging.info(f"url: {url} 缓存未过期，直接使用缓存✅")
+                metrics.count("fetch_results", result="fresh_cache")
+                return http_cache.load_channels(entry)
+            timeout = config.fetch_timeout
+            if deadline is not None:
+                timeout = max(0.1, min(timeout, deadline - time.monotonic()))
+            with metrics.timer("request_seconds", kind="source"), (session or requests).get(
+                url,
+                stream=True,
+                timeout=timeout,
+                headers=http_cache.conditional_headers(entry),
+            ) as response:
+                if response.status_code == 304 and entry:
+                    logging.info(f"url: {url} 未修改(304)，使用缓存✅")
+                    metrics.count("fetch_results", result="not_modified")
+                    return http_cache.load_channels(entry)
+                response.raise_for_status()
+                response.encoding = "utf-8"
+                lines = response.iter_lines(chunk_size=65536, decode_unicode=True)
+                if deadline is not None:
+                    lines = until_deadline(lines, deadline)
+                body_path = http_cache.save_body(url, lines)
+                metrics.count("download_bytes", response.raw.tell(), kind="source")
+            metrics.count("fetch_results", result="downloaded")
+            channels = collect_channels(url, parse_source(body_path, parse_pool))
+            if channels:
+                http_cache.store(url, response, channels)
+    except (requests.RequestException, OSError) as e:
         logging.error(f"url: {url} 爬取失败❌, Error: {e}")
+        metrics.count("fetch_results", result="error")
 
     return channels
 
 
-def match_channels(template_channels, all_channels):
-    matched_channels = OrderedDict()
+def until_deadline(lines, deadline):
+    """
+    逐行转发，超过截止时刻时抛出 TimeoutError
+    """
+    for line in lines:
+        if time.monotonic() > deadline:
+            raise TimeoutError("超出总时限，中断下载")
+        yield line
 
-    for category, channel_list in template_channels.items():
-        matched_channels[category] = OrderedDict()
-        for channel_name in channel_list:
-            cur_channel_name = channel_name
-            cur_list = [channel_name]
-            if "|" in channel_name:
-                cur_list = channel_name.split("|")
-                cur_channel_name = cur_list[0]
-            for online_category, online_channel_list in all_channels.items():
-                for online_channel_name, online_channel_url in online_channel_list:
-                    for item in cur_list:
-                        if item == online_channel_name:
-                            matched_channels[category].setdefault(cur_channel_name, []).append(
-                                online_channel_url
-                            )
 
-    return matched_channels
+def parse_source(path, parse_pool=None):
+    """
+    解析直播源文件：不小于 parse_pool_min_bytes 的交给解析进程池，其余在当前线程解析
+    """
+    if parse_pool is not None and os.path.getsize(path) >= config.parse_pool_min_bytes:
+        metrics.count("parsed_sources", mode="process")
+        return parse_pool.submit(parse_file, os.path.abspath(path)).result()
+    metrics.count("parsed_sources", mode="thread")
+    return parse_file(path)
 
 
-def filter_source_urls(template_file):
-    template_channels = parse_template(template_file)
-    source_urls = config.source_urls
+def collect_channels(url, parsed):
+    """
+    解析结果还原为按分类汇总的频道
+    """
+    logging.info(f"url: {url} 获取成功，判断为{parsed.source_type}格式")
+    channels = to_channels(parsed)
+    if channels:
+        categories = ", ".join(channels.keys())
+        logging.info(f"url: {url} 爬取成功✅，包含频道数：{len(parsed.names)} 包含频道分类: {categories}")
 
-    all_channels = OrderedDict()
-    for url in source_urls:
-        fetched_channels = fetch_channels(url)
-        for category, channel_list in fetched_channels.items():
-            if category in all_channels:
-                all_channels[category].extend(channel_list)
-            else:
-                all_channels[category] = channel_list
+    return channels
 
-    matched_channels = match_channels(template_channels, all_channels)
 
-    return matched_channels, template_channels
+@metrics.timed("stage_seconds", stage="match")
+def match_channels(template, table, rows):
+    """
+    在线频道名称逐个解析到模板频道（精确、规范化、模糊），每个名称只解析一次；
+    非精确匹配汇总后记录日志，模糊匹配逐条给出相似度
+    """
+    matched_channels = OrderedDict()
+    channel_index = build_channel_index(table, rows)
+    resolver = NameResolver(
+        template,
+        normalize=config.name_normalize,
+        threshold=config.name_fuzzy_threshold,
+    )
+
+    entry_hits = {}
+    match_counts = Counter()
+    for name_id, hits in channel_index.items():
+        online_name = table.names[name_id]
+        entry_ids, confidence = resolver.resolve(online_name)
+        if not entry_ids:
+            continue
+        if confidence == EXACT:
+            match_counts["exact"] += 1
+        elif confidence == NORMALIZED:
+            match_counts["normalized"] += 1
+        else:
+            match_counts["fuzzy"] += 1
+            display_names = ", ".join(template.entries[entry_id].name for entry_id in entry_ids)
+            logging.info(f"模糊匹配：{online_name} -> {display_names}，相似度 {confidence}")
+        for entry_id in entry_ids:
+            entry_hits.setdefault(entry_id, []).append(hits)
+    for kind, kind_count in match_counts.items():
+        metrics.count("name_matches", kind_count, kind=kind)
+    logging.info(
+        f"频道名称匹配：在线名称 {len(channel_index)} 个，"
+        + f"精确 {match_counts['exact']} 个，规范化 {match_counts['normalized']} 个，模糊 {match_counts['fuzzy']} 个"
+    )
+
+    for entry_id, entry in enumerate(template.entries):
+        matched_channels.setdefault(entry.category, OrderedDict())
+        if entry_id in entry_hits:
+            urls = merge_hits(table, entry_hits[entry_id])
+            matched_channels[entry.category].setdefault(entry.name, []).extend(urls)
 
+    return matched_channels
 
-def is_ipv6(url):
-    return re.match(r"^http:\/\/\[[0-9a-fA-F:]+\]", url) is not None
 
+@metrics.timed("stage_seconds", stage="fetch")
+def fetch_all_channels(source_urls):
+    """
+    并发获取所有直播源，共享连接池，较大的直播源在解析进程池中解析，结果按配置顺序返回。
+    获取线程是守护线程，超出总时限后直接返回，未完成的直播源不会拖住进程退出。
+    网络直播源获取成功后写入检查点，恢复运行时直接使用检查点中的结果
+    """
+    session = create_session(config.fetch_workers)
+    deadline = time.monotonic() + config.fetch_deadline
+    results = [OrderedDict() for _ in source_urls]
+    url_queue = Queue()
+    result_queue = Queue()
+    pending = set()
+    parse_pool = None
+    for index, url in enumerate(source_urls):
+        if checkpoint.has("source", url):
+            logging.info(f"url: {url} 本次运行已获取，使用检查点✅")
+            metrics.count("fetch_results", result="checkpoint")
+            results[index] = OrderedDict(
+                (category, [tuple(item) for item in channel_list])
+                for category, channel_list in checkpoint.get("source", url)
+            )
+        else:
+            url_queue.put((index, url))
+            pending.add(index)
+    url_queue.put(DONE)
+
+    def fetch(item, emit):
+        index, url = item
+        # 超出总时限后剩下的直播源不再开始获取
+        if time.monotonic() >= deadline:
+            return
+        try:
+            emit((index, fetch_channels(url, session, parse_pool, deadline)))
+        except Exception as exc:
+            logging.error(f"url: {url} 爬取失败❌, Error: {exc}")
+            emit((index, OrderedDict()))
 
-def updateChannelUrlsM3U(channels, template_channels):
-    written_urls = set()
+    try:
+        if pending:
+            # 只在有直播源需要获取时创建，并且先于获取线程创建，fork 时只有主线程
+            if wants_parse_pool([source_urls[index] for index in pending]):
+                parse_pool = create_parse_pool(config.parse_workers)
+            start_stage(fetch, url_queue, result_queue, config.fetch_workers)
+            for index, channels in iter_queue_until(result_queue, deadline):
+                pending.discard(index)
+                results[index] = channels
+                # 酒店组播的各个步骤单独记录，本地文件不需要记录
+                if channels and "://" in source_urls[index]:
+                    checkpoint.record("source", source_urls[index], list(channels.items()))
+        for index in sorted(pending):
+            logging.error(f"url: {source_urls[index]} 超出总时限 {config.fetch_deadline}s，已跳过❌")
+    finally:
+        if parse_pool is not None:
+            parse_pool.shutdown(wait=False, cancel_futures=True)
+        http_cache.evict()
+
+    return results
+
+
+def wants_parse_pool(urls):
+    """
+    是否创建解析进程池。parse_pool 为 "auto" 时，只在多核机器上、且有直播源（本地文件或上次下载的内容）
+    不小于 parse_pool_min_bytes 时创建；缓存未过期的直播源不需要解析，不计入
+    """
+    if config.parse_pool != "auto":
+        return bool(config.parse_pool)
+    if (os.cpu_count() or 1) < 2:
+        return False
+    for url in urls:
+        if url == HOTEL_SOURCE:
+            continue
+        if "://" not in url:
+            size = os.path.getsize(url) if os.path.exists(url) else None
+        else:
+            entry = http_cache.get(url)
+            size = None if entry and http_cache.is_fresh(entry) else http_cache.body_size(url)
+        if size is not None and size >= config.parse_pool_min_bytes:
+            return True
+    return False
+
+
+@metrics.timed("stage_seconds", stage="table")
+def build_channel_table(source_urls, fetched):
+    """
+    把各直播源的解析结果写入共享的列式频道表，之后不再保留每个直播源的 (名称, 地址) 列表
+    """
+    table = ChannelTable()
+    for url in source_urls:
+        table.add_source(url, fetched[url])
+    logging.info(
+        f"频道表共 {len(table)} 行，去重后名称 {len(table.names)} 个，地址 {len(table.urls)} 个"
+    )
+    return table
+
+
+def filter_source_urls(profile, table, url_blacklist, health_results):
+    template = template_cache.load(profile.template_file)
+    rows = table.merged_rows(profile.source_urls)
+
+    matched_channels = match_channels(template, table, rows)
+    if config.health_check:
+        with metrics.timer("stage_seconds", stage="health"):
+            matched_channels = check_channels(
+                matched_channels,
+                skip=url_blacklist.match,
+                results=health_results,
+                workers=config.health_workers,
+                per_host=config.health_per_host,
+                timeout=config.health_timeout,
+                budget=config.health_budget,
+                segment_count=config.health_segments,
+            )
+
+    return matched_channels, template
 
-    current_date = datetime.now().strftime("%Y-%m-%d")
-    for group in config.announcements:
-        for announcement in group["entries"]:
-            if announcement["name"] is None:
-                announcement["name"] = current_date
 
-    with open("live.m3u", "w", encoding="utf-8") as f_m3u:
-        f_m3u.write(
-            f"""#EXTM3U x-tvg-url={",".join(f'"{epg_url}"' for epg_url in config.epg_urls)}\n"""
+def render_announcements(profile, date):
+    """
+    公告分组：[(分组名称, [(名称, 图标, 地址)])]，没有名称的公告使用日期
+    """
+    return [
+        (
+            group["channel"],
+            [(announcement["name"] or date, announcement["logo"], announcement["url"]) for announcement in group["entries"]],
         )
+        for group in profile.announcements
+    ]
 
-        with open("live.txt", "w", encoding="utf-8") as f_txt:
-            for group in config.announcements:
-                f_txt.write(f"{group['channel']},#genre#\n")
-                for announcement in group["entries"]:
-                    f_m3u.write(
-                        f"""#EXTINF:-1 tvg-id="1" tvg-name="{announcement['name']}" tvg-logo="{announcement['logo']}" group-title="{group['channel']}",{announcement['name']}\n"""
+
+@metrics.timed("stage_seconds", stage="write")
+def updateChannelUrlsM3U(channels, template, url_families, profile, url_blacklist, previous=None):
+    """
+    一次遍历模板生成所有输出格式：每个频道的地址只挑选、拼接一次，交给各格式渲染到各自的缓冲区，
+    最后每个文件一次写入。与上次生成的分类指纹比较：没有分类变化时沿用上次的公告日期，
+    文件内容没有变化时不写入。返回本次的生成状态
+    """
+    written_urls = set()
+    duplicates = 0
+    block_fingerprints = OrderedDict()
+    formats = create_formats(profile.output_formats)
+
+    count = 0
+    for category, entries in template.categories:
+        for output_format in formats:
+            output_format.category(category)
+        block = []
+        if category in channels:
+            for entry in entries:
+                channel_name = entry.name
+                if channel_name in channels[category]:
+                    sorted_urls = sorted(
+                        channels[category][channel_name],
+                        key=lambda url: (
+                            url_families[url] != IPV6
+                            if profile.ip_version_priority == "ipv6"
+                            else url_families[url] == IPV6
+                        ),
                     )
-                    f_m3u.write(f"{announcement['url']}\n")
-                    f_txt.write(f"{announcement['name']},{announcement['url']}\n")
-            count = 0
-            for category, channel_list in template_channels.items():
-                f_txt.write(f"{category},#genre#\n")
-                if category in channels:
-                    for channel_name in channel_list:
-                        channel_name = channel_name.split("|")[0]
-                        if channel_name in channels[category]:
-                            sorted_urls = sorted(
-                                channels[category][channel_name],
-                                key=lambda url: (
-                                    not is_ipv6(url)
-                                    if config.ip_version_priority == "ipv6"
-                                    else is_ipv6(url)
-                                ),
+                    # sorted_urls = channels[category][channel_name]
+                    filtered_urls = []
+                    for url in sorted_urls:
+                        if url in written_urls:
+                            duplicates += 1
+                        elif url and not url_blacklist.is_blocked(url):
+                            filtered_urls.append(url)
+                            written_urls.add(url)
+                    if not filtered_urls:
+                        continue
+
+                    total_urls = len(filtered_urls)
+                    new_urls = []
+                    for index, url in enumerate(filtered_urls, start=1):
+                        if url_families[url] == IPV6:
+                            url_suffix = (
+                                f"$LR•IPV6"
+                                if total_urls == 1
+                                else f"$LR•{total_urls}•IPV6『线路{index}』"
                             )
-                            # sorted_urls = channels[category][channel_name]
-                            filtered_urls = []
-                            for url in sorted_urls:
-                                if (
-                                    url
-                                    and url not in written_urls
-                                    and not any(
-                                        blacklist in url for blacklist in config.url_blacklist
-                                    )
-                                ):
-                                    filtered_urls.append(url)
-                                    written_urls.add(url)
-
-                            total_urls = len(filtered_urls)
-                            for index, url in enumerate(filtered_urls, start=1):
-                                if is_ipv6(url):
-                                    url_suffix = (
-                                        f"$LR•IPV6"
-                                        if total_urls == 1
-                                        else f"$LR•{total_urls}•IPV6『线路{index}』"
-                                    )
-                                else:
-                                    url_suffix = (
-                                        f"$LR•IPV4"
-                                        if total_urls == 1
-                                        else f"$LR•{total_urls}•IPV4『线路{index}』"
-                                    )
-                                if "$" in url:
-                                    base_url = url.split("$", 1)[0]
-                                else:
-                                    base_url = url
-
-                                new_url = f"{base_url}{url_suffix}"
-
-                                f_m3u.write(
-                                    f'#EXTINF:-1 tvg-id="{index}" tvg-name="{channel_name}" tvg-logo="https://gitee.com/yuanzl77/TVBox-logo/raw/main/png/{channel_name}.png" group-title="{category}",{channel_name}\n'
-                                )
-                                f_m3u.write(new_url + "\n")
-                                f_txt.write(f"{channel_name},{new_url}\n")
-                                count += 1
-
-            f_txt.write("\n")
-            logging.info(f"爬取完成✅，共计频道数：{count}")
-
-
+                        else:
+                            url_suffix = (
+                                f"$LR•IPV4"
+                                if total_urls == 1
+                                else f"$LR•{total_urls}•IPV4『线路{index}』"
+                            )
+                        if "$" in url:
+                            base_url = url.split("$", 1)[0]
+                        else:
+                            base_url = url
+
+                        new_urls.append(f"{base_url}{url_suffix}")
+
+                    for output_format in formats:
+                        output_format.channel(category, channel_name, new_urls)
+                    block.append((channel_name, new_urls))
+                    count += total_urls
+        block_fingerprints[category] = fingerprint(block)
+
+    previous = previous or {}
+    changed = [
+        category
+        for category, block_fingerprint in block_fingerprints.items()
+        if previous.get("blocks", {}).get(category) != block_fingerprint
+    ]
+    announcement_fingerprint = fingerprint(profile.announcements)
+    if not changed and previous.get("announcement_fingerprint") == announcement_fingerprint:
+        announcement_date = previous["announcement_date"]
+    else:
+        announcement_date = datetime.now().strftime("%Y-%m-%d")
+    if changed:
+        logging.info(f"{profile.output_name} 有变化的分类：{', '.join(changed)}")
+
+    announcements = render_announcements(profile, announcement_date)
+    for output_format in formats:
+        path = f"{profile.output_name}.{output_format.extension}"
+        if not write_if_changed(path, output_format.render(profile.epg_urls, announcements)):
+            logging.info(f"{path} 内容没有变化，跳过写入")
+
+    logging.info(f"{profile.output_name} 爬取完成✅，共计频道数：{count}")
+    url_blacklist.report()
+    metrics.count("urls_written", count, profile=profile.output_name)
+    metrics.count("urls_duplicate", duplicates, profile=profile.output_name)
+    metrics.count("urls_blacklisted", sum(url_blacklist.dropped.values()), profile=profile.output_name)
+
+    return {
+        "blocks": block_fingerprints,
+        "announcement_fingerprint": announcement_fingerprint,
+        "announcement_date": announcement_date,
+    }
+
+
+@metrics.timed("stage_seconds", stage="hotel")
 def getHotel():
+    """
+    酒店组播发现流水线：搜索 -> 获取频道列表 -> 测速 三个阶段同时进行，阶段之间用有界队列连接。
+    通过连通性检测的 IP 立即获取频道列表，获取到的列表立即开始测速
+    """
     sources = []
     lines = OrderedDict()
-    ipspeed = []
+    history = HistoryStore(config.history_db, config.history_half_life, config.history_retention)
     try:
-        for item in getHotelSearch("广东电信"):
-            lines[item] = getHotelList(item)
+        stable = history.stable_hosts(config.history_max_age, config.history_min_runs, config.history_max_variation)
+        ip_queue = Queue(maxsize=config.hotel_queue_size)
+        list_queue = Queue(maxsize=config.hotel_queue_size)
+
+        # 恢复运行时已测过的频道不再测速，测速结果与本次结果合并
+        measured = OrderedDict()
+
+        def fetch_list(ip, emit):
+            lines[ip] = checkpoint.get("list", ip)
+            if lines[ip] is None:
+                lines[ip] = getHotelList(ip)
+                if lines[ip]:
+                    checkpoint.record("list", ip, lines[ip])
+            if not lines[ip] or ip in stable:
+                return
+            untested = []
+            for channel in lines[ip][:SAMPLE_SIZE]:
+                rate = checkpoint.get("sample", f"{ip} {channel.split(',', 1)[1]}")
+                if rate is None:
+                    untested.append(channel)
+                else:
+                    measured.setdefault(ip, []).append(rate)
+            if untested:
+                emit((ip, untested))
+
+        def on_sample(ip, url, sample):
+            metrics.count("speed_samples", result="ok" if sample.rate > 0 else "failed")
+            metrics.observe("speed_sample_mbps", sample.rate, buckets=metrics.SPEED_BUCKETS)
+            if sample.ttfb is not None:
+                metrics.observe("request_seconds", sample.ttfb, kind="speed_ttfb", status="ok")
+            history.record_sample(ip, url, sample)
+            checkpoint.record("sample", f"{ip} {url}", sample.rate)
+
+        # 历史记录只在当前线程访问（SQLite 连接不能跨线程使用）
+        good_hosts = history.good_hosts(config.history_min_speed)
+        start_producer(lambda emit: getHotelSearch("广东电信", good_hosts, emit), ip_queue)
+        start_stage(fetch_list, ip_queue, list_queue, config.hotel_list_workers)
 
         #
         # 测速15个频道，取最大值按IP排序
         #
-        if len(lines) > 0:
-            speed_test_results = OrderedDict()
-            for ip, list in lines.items():
-                with ThreadPoolExecutor(max_workers=15) as executor:
-                    future_to_channel = {
-                        executor.submit(download_speed_test, ip, source): source
-                        for source in list[:15]
-                    }
-                    for future in as_completed(future_to_channel):
-                        channel = future_to_channel[future]
-                        try:
-                            ip, download_rate = future.result()
-
-                            speed_test_results.setdefault(ip, []).append(download_rate)
-
-                            # if ip in speed_test_results:
-                            #     if speed_test_results[ip] < download_rate:
-                            #         speed_test_results[ip] = download_rate
-                            # else:
-                            #     speed_test_results[ip] = download_rate
-                        except Exception as exc:
-                            logging.info(f"频道：{channel[0]} 测速时发生异常：{exc}")
+        if config.hotel_speed_engine == "asyncio":
+            speed_test_results = run_async_speed_tests(
+                iter_queue(list_queue),
+                workers=config.hotel_speed_workers,
+                per_host=config.hotel_speed_per_host,
+                good_speed=config.hotel_good_speed,
+                on_sample=on_sample,
+                hls_segments=config.hls_segments,
+                hls_min_ratio=config.hls_min_ratio,
+            )
+        else:
+            speed_test_results = run_speed_tests(
+                iter_queue(list_queue),
+                download_speed_test,
+                workers=config.hotel_speed_workers,
+                per_host=config.hotel_speed_per_host,
+                good_speed=config.hotel_good_speed,
+                on_sample=on_sample,
+            )
+
+        for ip, rates in measured.items():
+            speed_test_results[ip] = rates + speed_test_results.get(ip, [])
 
+        if len(lines) > 0:
             result = OrderedDict()
             for key, value in speed_test_results.items():
                 if len([x for x in value if x == 0]) >= 10:
                     result[key] = 0
                 else:
                     result[key] = max(value)
+                history.record_result(key, result[key])
+            for key, value in stable.items():
+                if key in lines:
+                    logging.info(f"频道IP：{key} 历史测速稳定，跳过测速，得分：{value}")
+                    result[key] = value
 
             result = OrderedDict(sorted(result.items(), key=lambda t: t[1], reverse=True))
 
             for key, value in result.items():
                 logging.info(f"频道IP：{key}, 速度：{value}")
-                ipspeed.append(f"{key},{value}")
                 if value > 0.2:
                     for url in lines[key]:
                         sources.append(f"{url}")
 
-            with open("hotelspeed.txt", "w", encoding="utf-8") as f_txt:
-                f_txt.write(f"{"\n".join(ipspeed)}")
-
-            with open("hotel.txt", "w", encoding="utf-8") as f_txt:
-                f_txt.write(f"{"\n".join(sources)}")
-
-            with open("hotel.m3u", "w", encoding="utf-8") as f_m3u:
-                f_m3u.write(
-                    f"""#EXTM3U x-tvg-url={",".join(f'"{epg_url}"' for epg_url in config.epg_urls)}\n"""
+            # 原子写入，写入过程中读取的一方不会拿到不完整的文件
+            atomic_write("hotel.txt", "\n".join(sources))
+            m3u_lines = [f"""#EXTM3U x-tvg-url={",".join(f'"{epg_url}"' for epg_url in config.epg_urls)}\n"""]
+            index = 1
+            channel_name_old = ""
+            for item in sources:
+                channel_name, new_url = item.split(",")
+                if channel_name_old != channel_name:
+                    channel_name_old = channel_name
+                    index = 1
+                m3u_lines.append(
+                    f'#EXTINF:-1 tvg-id="{index}" tvg-name="{channel_name}" tvg-logo="https://epg.112114.free.hr/logo/{channel_name}.png" group-title="酒店组播",{channel_name}\n'
                 )
-                index = 1
-                channel_name_old = ""
-                for item in sources:
-                    channel_name, new_url = item.split(",")
-                    if channel_name_old != channel_name:
-                        channel_name_old = channel_name
-                        index = 1
-                    f_m3u.write(
-                        f'#EXTINF:-1 tvg-id="{index}" tvg-name="{channel_name}" tvg-logo="https://epg.112114.free.hr/logo/{channel_name}.png" group-title="酒店组播",{channel_name}\n'
-                    )
-                    f_m3u.write(new_url + "\n")
-                    index += 1
+                m3u_lines.append(new_url + "\n")
+                index += 1
+            atomic_write("hotel.m3u", "".join(m3u_lines))
         else:
             sources = getHisHotel()
 
     except requests.RequestException as e:
         sources = getHisHotel()
+    finally:
+        history.close()
 
     return ["酒店组播,#genre#"] + sources
 
 
-def getHotelSearch(key):
-    try:
-        ips = []
-        try:
-            hips = []
-            with open("hotelspeed.txt", "r", encoding="utf-8") as f_txt:
-                hips = f_txt.read().split("\n")
-            for item in hips:
-                ip, speed = item.split(",")
-                if float(speed) > 0.5:
-                    ips.append(ip)
-        except:
-            pass
-
-        requests.get(
-            url="http://www.foodieguide.com/iptvsearch/",
-            headers={
-                "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/58.0.3029.110 Safari/537.3",
-            },
-        )
-        requests.get(
-            url="http://tonkiang.us/",
-            headers={
-                "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/58.0.3029.110 Safari/537.3",
-            },
-        )
-
-        hotel = "http://www.foodieguide.com/iptvsearch/hoteliptv.php"
+def getHotelSearch(key, good_hosts, emit):
+    """
+    搜索酒店组播 IP：历史得分高的 IP（good_hosts）先交给下一阶段，搜索到的候选每连通一个就交给下一阶段，返回所有 IP
+    """
+    result = []
 
-        rsp = requests.post(
-            url=hotel,
-            data={
-                "saerch": key,
-                "Submit": "",
-                "names": "Tom",
-                "city": "HeZhou",
-                "address": "Ca94122",
-            },
-            headers={
-                "Host": "www.foodieguide.com",
-                "Origin": "http://www.foodieguide.com",
-                "Referer": "http://www.foodieguide.com/iptvsearch/hoteliptv.php",
-            },
-        )
-        rsp.encoding = "utf-8"
-        root = BeautifulSoup(rsp.text, "lxml")
-        els = root.select('div[style="color:limegreen; "]')
-
-        for item in els:
-            if item.parent.parent.a.get_text().strip() not in ips:
-                ip, port = item.parent.parent.a.get_text().strip().split(":")
-                if test_ip_port_connectivity(ip, int(port)):
-                    ips.append(item.parent.parent.a.get_text().strip())
-
-        # ips.append("jt.zorua.cn:8787")
-        result = []
-        # 去重复
-        for item in ips:
-            if item not in result:
-                result.append(item)
+    def add(item, latency=None):
+        if item not in result:
+            if latency is not None:
+                logging.info(f"连接 {item} 成功，耗时 {latency}s")
+            result.append(item)
+            emit(item)
 
+    try:
+        for item in good_hosts:
+            add(item)
+
+        candidates = checkpoint.get("search", key)
+        if candidates is None:
+            candidates = getHotelCandidates(key)
+            checkpoint.record("search", key, candidates)
+            metrics.count("hotel_candidates", len(candidates))
+        else:
+            logging.info(f"url：酒店组播 本次运行已搜索，使用检查点✅")
+
+        for item, latency in checkpoint.items("probe"):
+            if item in candidates:
+                add(item, latency)
+
+        if not checkpoint.has("probe_done", key):
+            # 连通的候选先放入无界队列，由当前线程交给下一阶段，下一阶段的积压不会拖过检测总时限
+            handoff = Queue()
+            complete = []
+
+            def probe(put):
+                # 候选已去重且不含已添加的 IP，不会重复添加
+                _, finished = probe_reachable(
+                    [item for item in candidates if item not in result],
+                    timeout=config.hotel_probe_timeout,
+                    deadline=config.hotel_probe_deadline,
+                    concurrency=config.hotel_probe_concurrency,
+                    on_reachable=lambda item, latency: handoff.put_nowait((item, latency)),
+                )
+                complete.append(finished)
+
+            start_producer(probe, handoff)
+            for item, latency in iter_queue(handoff):
+                metrics.observe("request_seconds", latency, kind="hotel_probe", status="ok")
+                checkpoint.record("probe", item, latency)
+                add(item, latency)
+            # 超出总时限时还有未检测完的候选，恢复运行时需要重新检测
+            if complete and complete[0]:
+                checkpoint.record("probe_done", key, True)
+
+        # add("jt.zorua.cn:8787")
         logging.info(f"\n酒店组播IP：\n{"\n".join(result)}\n")
-        return result
     except:
         logging.info(f"url：酒店组播 搜索失败❌")
-        return []
+    return result
 
 
+@metrics.timed("request_seconds", kind="hotel_search")
+def getHotelCandidates(key):
+    """
+    搜索页面上标记为可用的酒店组播 ip:port
+    """
+    hotel_client.get(
+        url="http://www.foodieguide.com/iptvsearch/",
+        headers={
+            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/58.0.3029.110 Safari/537.3",
+        },
+    )
+    hotel_client.get(
+        url="http://tonkiang.us/",
+        headers={
+            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/58.0.3029.110 Safari/537.3",
+        },
+    )
+
+    hotel = "http://www.foodieguide.com/iptvsearch/hoteliptv.php"
+
+    rsp = hotel_client.post(
+        url=hotel,
+        data={
+            "saerch": key,
+            "Submit": "",
+            "names": "Tom",
+            "city": "HeZhou",
+            "address": "Ca94122",
+        },
+        headers={
+            "Host": "www.foodieguide.com",
+            "Origin": "http://www.foodieguide.com",
+            "Referer": "http://www.foodieguide.com/iptvsearch/hoteliptv.php",
+        },
+    )
+    rsp.encoding = "utf-8"
+    return parse_search_page(rsp.text)
+
+
+@metrics.timed("request_seconds", kind="hotel_list")
 def getHotelList(ip):
     url = ""
     try:
-        session = requests.Session()
         lines = []
         # url = f"http://www.foodieguide.com/iptvsearch/hotellist.html?s={ip}"
         # rsp = session.get(
@@ -381,7 +651,7 @@ def getHotelList(ip):
         #     },
         # )
         url = f"http://www.foodieguide.com/iptvsearch/allllist.php?s={ip}&y=false"
-        rsp = session.get(
+        rsp = hotel_client.get(
             url,
             headers={
                 "Host": "www.foodieguide.com",
@@ -390,11 +660,7 @@ def getHotelList(ip):
         )
         logging.info(f"url：{url} {rsp.text}")
         if rsp.status_code == 200:
-            root = BeautifulSoup(rsp.text, "lxml")
-            els = root.select("div.m3u8")
-            for i in els:
-                name = i.parent.select(".channel")[0].get_text().strip()
-                ip = i.get_text().strip()
+            for name, ip in parse_list_page(rsp.text):
                 # if "高清" in name:
                 lines.append("{0},{1}".format(name.replace("高清", ""), ip))
         if len(lines) > 0:
@@ -421,19 +687,6 @@ def getHisHotel():
     return sources
 
 
-def test_ip_port_connectivity(ip, port):
-    """
-    测试指定 IP 和端口的连通性
-    """
-    try:
-        sock = socket.create_connection((ip, port), timeout=5)
-        sock.close()
-        return True
-    except Exception as e:
-        logging.info(f"连接 {ip}:{port} 失败: {e}")
-        return False
-
-
 def download_speed_test(ip, channel):
     """
     执行下载速度测试
@@ -465,7 +718,105 @@ def download_speed_test(ip, channel):
     return ip, download_rate
 
 
+def profile_fingerprint(profile, source_fingerprints):
+    """
+    一组输出的全部输入：输出格式版本、模板、输出相关配置、影响地址筛选的检测配置以及各直播源解析结果的指纹
+    """
+    return fingerprint(
+        FORMAT_VERSION,
+        template_cache.load(profile.template_file).digest,
+        profile.url_blacklist,
+        profile.announcements,
+        profile.epg_urls,
+        profile.ip_version_priority,
+        profile.output_formats,
+        config.name_normalize,
+        config.name_fuzzy_threshold,
+        config.dns_resolve,
+        config.health_check,
+        config.health_workers,
+        config.health_per_host,
+        config.health_timeout,
+        config.health_budget,
+        config.health_segments,
+        [source_fingerprints[url] for url in profile.source_urls],
+    )
+
+
+def is_unchanged(profile, inputs, previous):
+    if not config.incremental or not previous or previous.get("inputs") != inputs:
+        return False
+    if time.time() - previous.get("built_at", 0) >= config.incremental_max_age:
+        return False
+    return all(
+        os.path.exists(f"{profile.output_name}.{output_format.extension}")
+        for output_format in create_formats(profile.output_formats)
+    )
+
+
+def main(profile_names):
+    """
+    运行所有配置，无论成功与否都写入本次运行的指标报告
+    """
+    try:
+        run(profile_names)
+    finally:
+        metrics.write_report(
+            config.metrics_report, config.metrics_prometheus, run_id=checkpoint.run_id, profiles=profile_names
+        )
+
+
+def run(profile_names):
+    """
+    一次运行生成所有配置的输出：所有配置的直播源合并后只获取一次，解析结果、检测结果在配置之间共享；
+    输入没有变化的配置跳过匹配、检测和写入
+    """
+    profiles = [importlib.import_module(name) for name in profile_names]
+    source_urls = list(OrderedDict.fromkeys(url for profile in profiles for url in profile.source_urls))
+    # 酒店组播本次会重新生成 hotel.m3u/hotel.txt，列出这些文件的配置直接使用内存中的结果，不读取磁盘上的旧文件
+    hotel_files = [url for url in source_urls if url in HOTEL_FILES] if HOTEL_SOURCE in source_urls else []
+    fetch_urls = [url for url in source_urls if url not in hotel_files]
+    fetched = dict(zip(fetch_urls, fetch_all_channels(fetch_urls)))
+    for url in hotel_files:
+        logging.info(f"url: {url} 使用本次运行的酒店组播结果✅")
+        fetched[url] = fetched[HOTEL_SOURCE]
+    source_fingerprints = {url: fingerprint(list(channels.items())) for url, channels in fetched.items()}
+    table = build_channel_table(source_urls, fetched)
+    del fetched
+    build_state = BuildState(config.incremental_state)
+
+    health_results = {}
+    outputs = []
+    for profile in profiles:
+        inputs = profile_fingerprint(profile, source_fingerprints)
+        if is_unchanged(profile, inputs, build_state.get(profile.output_name)):
+            logging.info(f"{profile.output_name} 输入没有变化，跳过匹配、检测和写入")
+            continue
+        url_blacklist = UrlBlacklist(profile.url_blacklist)
+        channels, template = filter_source_urls(profile, table, url_blacklist, health_results)
+        outputs.append((profile, inputs, url_blacklist, channels, template))
+
+    with metrics.timer("stage_seconds", stage="dns"):
+        url_families = classify_urls(
+            (
+                url
+                for _, _, _, channels, _ in outputs
+                for channel_map in channels.values()
+                for urls in channel_map.values()
+                for url in urls
+            ),
+            resolve=config.dns_resolve,
+            workers=config.dns_workers,
+            deadline=config.dns_deadline,
+        )
+    for profile, inputs, url_blacklist, channels, template in outputs:
+        previous = build_state.get(profile.output_name)
+        state = updateChannelUrlsM3U(channels, template, url_families, profile, url_blacklist, previous)
+        state.update(inputs=inputs, built_at=time.time())
+        build_state.set(profile.output_name, state)
+    build_state.save()
+    checkpoint.finish()
+
+
 if __name__ == "__main__":
-    template_file = "demo.txt"
-    channels, template_channels = filter_source_urls(template_file)
-    updateChannelUrlsM3U(channels, template_channels)
+    main(sys.argv[1:] or config.profiles)
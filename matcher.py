@@ -0,0 +1,155 @@
+import re
+import unicodedata
+from collections import Counter
+from heapq import merge
+
+# 画质、编码等不影响频道身份的标记：中文标记直接去掉；英文标记前面不能紧跟字母，1080P 等前面也不能紧跟数字。
+# 4K/8K 是频道身份的一部分（CCTV4K、4K影院、爱上4K），不去掉
+QUALITY_PATTERN = re.compile(
+    r"超高清|高清|超清|标清|蓝光"
+    r"|(?<![A-Z])(?:FHD|UHD|HD|SD|HEVC|H\.?26[45])(?![A-Z0-9])"
+    r"|(?<![A-Z0-9])\d{3,4}[PI](?![A-Z0-9])"
+)
+PUNCTUATION_PATTERN = re.compile(r"[^\w+]|_")
+NUMBER_PATTERN = re.compile(r"\d+")
+# 模糊匹配的签名：数字（可带 K）以及任意字符后的 +，签名不同的名称不会互相匹配
+SIGNATURE_PATTERN = re.compile(r"\d+K?\+?|\+")
+
+# 规范化名称的最短长度，更短的不参与规范化和模糊匹配
+MIN_KEY_LENGTH = 2
+
+# 匹配可信度：精确匹配别名、规范化后相同，模糊匹配为 n-gram 相似度
+EXACT = 1.0
+NORMALIZED = 0.95
+
+
+def normalize_name(name):
+    """
+    频道名称规范化：全角转半角、统一大写，去掉画质标记和标点空白，数字去掉前导零（CCTV-01 高清 -> CCTV1）
+    """
+    name = unicodedata.normalize("NFKC", name).upper()
+    name = QUALITY_PATTERN.sub("", name)
+    name = PUNCTUATION_PATTERN.sub("", name)
+    return NUMBER_PATTERN.sub(lambda m: str(int(m.group())), name)
+
+
+def bigrams(key):
+    if len(key) < 2:
+        return {key}
+    return {key[i : i + 2] for i in range(len(key) - 1)}
+
+
+class NameResolver:
+    """
+    在线频道名称 -> 模板频道编号：先精确匹配别名，再比较规范化名称，最后用 bigram 索引做有界的模糊匹配。
+    模糊匹配只在签名（数字和 +）完全相同的候选中进行（CCTV5 与 CCTV5+、广东体育与广东体育+、
+    CCTV1 与 CCTV11、CCTV8 与 CCTV8K 不会互相匹配），
+    相似度（Dice 系数）不低于 threshold 且最高分唯一时才采用；threshold 为 None 时关闭模糊匹配。
+    太短或过于笼统的规范化名称（是两个以上其它频道的名称前缀，如 CCTV、广东）只能精确匹配
+    """
+
+    def __init__(self, template, normalize=True, threshold=0.85):
+        self.entries = template.entries
+        self.exact = template.lookup
+        self.normalized = {}
+        self.grams = {}
+        self.gram_counts = {}
+        self.signatures = set()
+        self.normalize = normalize
+        self.threshold = threshold
+        self.prefixes = {}
+        if normalize:
+            keys = [
+                (normalize_name(alias), entry_id)
+                for entry_id, entry in enumerate(self.entries)
+                for alias in entry.aliases
+            ]
+            for key, entry_id in keys:
+                for end in range(1, len(key)):
+                    # 不在数字中间截断：CCTV1 不是 CCTV11 的前缀
+                    if not (key[end - 1].isdigit() and key[end].isdigit()):
+                        self.prefixes.setdefault(key[:end], set()).add(entry_id)
+            for key, entry_id in keys:
+                if not self.is_generic(key, entry_id):
+                    _add_unique(self.normalized, key, entry_id)
+        for key in self.normalized:
+            signature = tuple(SIGNATURE_PATTERN.findall(key))
+            key_grams = bigrams(key)
+            self.signatures.add(signature)
+            self.gram_counts[key] = len(key_grams)
+            for gram in key_grams:
+                self.grams.setdefault((signature, gram), []).append(key)
+
+    def resolve(self, name):
+        """
+        返回 (模板频道编号列表, 可信度)，没有匹配时返回 ([], 0)
+        """
+        if name in self.exact:
+            return self.exact[name], EXACT
+        if not self.normalize:
+            return [], 0
+        key = normalize_name(name)
+        if key in self.normalized:
+            return self.normalized[key], NORMALIZED
+        if self.threshold is None or self.is_generic(key):
+            return [], 0
+
+        signature = tuple(SIGNATURE_PATTERN.findall(key))
+        if signature not in self.signatures:
+            return [], 0
+        grams = bigrams(key)
+        overlaps = Counter()
+        for gram in grams:
+            overlaps.update(self.grams.get((signature, gram), ()))
+        best_score = 0
+        best = []
+        for candidate, overlap in overlaps.items():
+            score = 2 * overlap / (len(grams) + self.gram_counts[candidate])
+            if score > best_score:
+                best_score = score
+                best = [candidate]
+            elif score == best_score:
+                best.append(candidate)
+        if best_score < self.threshold or len(best) != 1:
+            return [], 0
+        return self.normalized[best[0]], round(best_score, 4)
+
+    def is_generic(self, key, entry_id=None):
+        """
+        规范化名称太短，或者是两个以上其它频道（不含 entry_id）的名称前缀
+        """
+        if len(key) < MIN_KEY_LENGTH:
+            return True
+        return len(self.prefixes.get(key, set()) - {entry_id}) >= 2
+
+
+def _add_unique(mapping, key, entry_id):
+    entry_ids = mapping.setdefault(key, [])
+    if entry_id not in entry_ids:
+        entry_ids.append(entry_id)
+
+
+def build_channel_index(table, rows):
+    """
+    一次遍历在线频道，建立 频道名称编号 -> [(出现位置, 地址编号)] 索引
+    """
+    index = {}
+    name_ids = table.name_ids
+    url_ids = table.url_ids
+    for position, row in enumerate(rows):
+        index.setdefault(name_ids[row], []).append((position, url_ids[row]))
+    return index
+
+
+def merge_hits(table, hits):
+    """
+    按在线频道出现顺序合并多个名称的匹配地址，重复地址只保留第一次出现
+    """
+    url_ids = hits[0] if len(hits) == 1 else merge(*hits)
+    seen = set()
+    urls = []
+    for _, url_id in url_ids:
+        if url_id not in seen:
+            seen.add(url_id)
+            urls.append(table.urls[url_id])
+    return urls
@@ -0,0 +1,166 @@
+import functools
+import json
+import logging
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+from incremental import atomic_write
+
+# 直方图默认分桶（秒）
+TIME_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+# 测速结果分桶（MB/s）
+SPEED_BUCKETS = (0, 0.1, 0.2, 0.5, 1, 2, 5, 10, 20)
+
+_lock = threading.Lock()
+_counters = {}
+_histograms = {}
+_started_at = time.time()
+
+
+def _key(name, labels):
+    return name, tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+def count(name, value=1, **labels):
+    """
+    计数器累加
+    """
+    key = _key(name, labels)
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + value
+
+
+def observe(name, value, buckets=TIME_BUCKETS, **labels):
+    """
+    直方图记录一个观测值：次数、总和、最小值、最大值以及各分桶计数
+    """
+    key = _key(name, labels)
+    with _lock:
+        histogram = _histograms.get(key)
+        if histogram is None:
+            histogram = _histograms[key] = {
+                "count": 0,
+                "sum": 0,
+                "min": value,
+                "max": value,
+                "buckets": list(buckets),
+                "bucket_counts": [0] * len(buckets),
+            }
+        histogram["count"] += 1
+        histogram["sum"] += value
+        histogram["min"] = min(histogram["min"], value)
+        histogram["max"] = max(histogram["max"], value)
+        index = bisect_left(histogram["buckets"], value)
+        if index < len(histogram["buckets"]):
+            histogram["bucket_counts"][index] += 1
+
+
+@contextmanager
+def timer(name, **labels):
+    """
+    记录代码块耗时（秒），异常退出时 status 标签为 error
+    """
+    start_time = time.monotonic()
+    status = "ok"
+    try:
+        yield
+    except BaseException:
+        status = "error"
+        raise
+    finally:
+        observe(name, time.monotonic() - start_time, status=status, **labels)
+
+
+def timed(name, **labels):
+    """
+    记录函数耗时的装饰器
+    """
+
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with timer(name, **labels):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def snapshot():
+    def series(store, render):
+        return [
+            {"name": name, "labels": dict(labels), **render(value)} for (name, labels), value in sorted(store.items())
+        ]
+
+    with _lock:
+        return {
+            "counters": series(_counters, lambda value: {"value": value}),
+            "histograms": series(
+                _histograms,
+                lambda h: {
+                    "count": h["count"],
+                    "sum": round(h["sum"], 6),
+                    "min": round(h["min"], 6),
+                    "max": round(h["max"], 6),
+                    "buckets": dict(zip(map(str, h["buckets"]), h["bucket_counts"])),
+                },
+            ),
+        }
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _prometheus_labels(labels, **extra):
+    items = list(labels) + list(extra.items())
+    if not items:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in items) + "}"
+
+
+def render_prometheus(prefix="iptv"):
+    """
+    Prometheus 文本格式（可交给 node_exporter textfile collector）
+    """
+    lines = []
+    with _lock:
+        for name in sorted({name for name, _ in _counters}):
+            lines.append(f"# TYPE {prefix}_{name}_total counter")
+            for (series_name, labels), value in sorted(_counters.items()):
+                if series_name == name:
+                    lines.append(f"{prefix}_{name}_total{_prometheus_labels(labels)} {value}")
+        for name in sorted({name for name, _ in _histograms}):
+            lines.append(f"# TYPE {prefix}_{name} histogram")
+            for (series_name, labels), h in sorted(_histograms.items()):
+                if series_name != name:
+                    continue
+                cumulative = 0
+                for bucket, bucket_count in zip(h["buckets"], h["bucket_counts"]):
+                    cumulative += bucket_count
+                    lines.append(f"{prefix}_{name}_bucket{_prometheus_labels(labels, le=bucket)} {cumulative}")
+                lines.append(f'{prefix}_{name}_bucket{_prometheus_labels(labels, le="+Inf")} {h["count"]}')
+                lines.append(f"{prefix}_{name}_sum{_prometheus_labels(labels)} {h['sum']}")
+                lines.append(f"{prefix}_{name}_count{_prometheus_labels(labels)} {h['count']}")
+    return "\n".join(lines) + "\n"
+
+
+def write_report(path, prometheus_path=None, **info):
+    """
+    写入本次运行的指标报告（JSON），info 为附加的运行信息（运行 ID 等）
+    """
+    report = {"started_at": _started_at, "duration": round(time.time() - _started_at, 3), **info, **snapshot()}
+    try:
+        for output_path, text in (
+            (path, json.dumps(report, ensure_ascii=False, indent=1)),
+            (prometheus_path, render_prometheus() if prometheus_path else None),
+        ):
+            if output_path:
+                os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+                atomic_write(output_path, text)
+    except OSError as e:
+        logging.error(f"写入指标报告失败❌, Error: {e}")
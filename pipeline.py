@@ -0,0 +1,79 @@
+import logging
+import threading
+import time
+from queue import Empty
+
+# 队列结束标记
+DONE = object()
+
+
+def iter_queue(queue):
+    """
+    逐个取出队列中的元素，直到遇到结束标记
+    """
+    while True:
+        item = queue.get()
+        if item is DONE:
+            return
+        yield item
+
+
+def iter_queue_until(queue, deadline):
+    """
+    同 iter_queue，超过截止时刻（time.monotonic()）时不再等待
+    """
+    while True:
+        try:
+            item = queue.get(timeout=max(0, deadline - time.monotonic()))
+        except Empty:
+            return
+        if item is DONE:
+            return
+        yield item
+
+
+def start_producer(produce, outputs):
+    """
+    在后台线程中运行 produce(emit)，emit 把元素放入有界队列 outputs（队列满时等待），结束后放入结束标记
+    """
+
+    def run():
+        try:
+            produce(outputs.put)
+        except Exception as exc:
+            logging.error(f"流水线生产者发生异常❌, Error: {exc}")
+        finally:
+            outputs.put(DONE)
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    return thread
+
+
+def start_stage(process, inputs, outputs, workers):
+    """
+    启动 workers 个线程处理 inputs 中的元素：process(item, emit) 可以向 outputs 放入任意个结果。
+    inputs 结束后所有线程退出，最后一个退出的线程向 outputs 放入结束标记
+    """
+    remaining = [workers]
+    lock = threading.Lock()
+
+    def run():
+        try:
+            for item in iter_queue(inputs):
+                try:
+                    process(item, outputs.put)
+                except Exception as exc:
+                    logging.error(f"流水线处理 {item} 时发生异常❌, Error: {exc}")
+        finally:
+            # 把结束标记还给其它线程
+            inputs.put(DONE)
+            with lock:
+                remaining[0] -= 1
+                if not remaining[0]:
+                    outputs.put(DONE)
+
+    threads = [threading.Thread(target=run, daemon=True) for _ in range(workers)]
+    for thread in threads:
+        thread.start()
+    return threads
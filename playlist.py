@@ -0,0 +1,113 @@
+import multiprocessing
+import os
+import re
+from array import array
+from collections import OrderedDict, namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from itertools import chain, islice
+
+EXTINF_PATTERN = re.compile(r'group-title="(.*?)",(.*)')
+TXT_PATTERN = re.compile(r"^(.*?),(.*?)$")
+
+# 解析结果的紧凑形式，可以在进程之间传递：分类按首次出现的顺序，counts 为各分类的频道数，
+# names/urls 按分类依次排列
+ParsedPlaylist = namedtuple("ParsedPlaylist", ["source_type", "categories", "counts", "names", "urls"])
+
+
+def parse_m3u(lines):
+    current_category = None
+    channel_name = None
+    for line in lines:
+        line = line.strip()
+        if line.startswith("#EXTINF"):
+            match = EXTINF_PATTERN.search(line)
+            if match:
+                current_category = match.group(1).strip()
+                channel_name = match.group(2).strip()
+        elif line and not line.startswith("#"):
+            if current_category and channel_name:
+                yield current_category, channel_name, line
+
+
+def parse_txt(lines):
+    current_category = None
+    for line in lines:
+        line = line.strip()
+        if "#genre#" in line:
+            current_category = line.split(",")[0].strip()
+        elif current_category:
+            match = TXT_PATTERN.match(line)
+            if match:
+                channel_name = match.group(1).strip()
+                channel_url = match.group(2).strip()
+                for item in channel_url.split("#"):
+                    yield current_category, channel_name, item
+            elif line:
+                yield current_category, line, ""
+
+
+def iter_channels(lines, head_size=15):
+    """
+    流式解析直播源：只缓冲前 head_size 行判断 m3u/txt 格式，逐条产出 (分类, 频道名称, 地址)
+    """
+    lines = iter(lines)
+    head = list(islice(lines, head_size))
+    if any("#EXTINF" in line for line in head):
+        return "m3u", parse_m3u(chain(head, lines))
+    return "txt", parse_txt(chain(head, lines))
+
+
+def parse_playlist(lines):
+    """
+    解析直播源并按分类汇总为 ParsedPlaylist
+    """
+    source_type, items = iter_channels(lines)
+    groups = OrderedDict()
+    # 相同的频道名称共用一个字符串对象，pickle 时只序列化一次
+    names = {}
+    for category, channel_name, channel_url in items:
+        group = groups.get(category)
+        if group is None:
+            group = groups[category] = ([], [])
+        group[0].append(names.setdefault(channel_name, channel_name))
+        group[1].append(channel_url)
+    return ParsedPlaylist(
+        source_type,
+        list(groups),
+        array("I", (len(names) for names, _ in groups.values())),
+        [name for names, _ in groups.values() for name in names],
+        [url for _, urls in groups.values() for url in urls],
+    )
+
+
+def parse_file(path):
+    """
+    解析直播源文件，在解析进程池中执行时只需要传递文件路径
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        return parse_playlist(f)
+
+
+def to_channels(parsed):
+    """
+    ParsedPlaylist 还原为 分类 -> [(频道名称, 地址)]
+    """
+    channels = OrderedDict()
+    start = 0
+    for category, count in zip(parsed.categories, parsed.counts):
+        channels[category] = list(zip(parsed.names[start : start + count], parsed.urls[start : start + count]))
+        start += count
+    return channels
+
+
+def create_parse_pool(workers):
+    """
+    创建解析进程池，workers 为 0 时按 CPU 核数。只使用 fork 启动方式（其它方式会在子进程中重新执行 main.py），
+    需要在启动其它线程之前调用；不支持 fork 的平台返回 None
+    """
+    if "fork" not in multiprocessing.get_all_start_methods():
+        return None
+    pool = ProcessPoolExecutor(max_workers=workers or os.cpu_count(), mp_context=multiprocessing.get_context("fork"))
+    # fork 方式在第一次提交任务时创建全部工作进程，此时只有当前线程
+    pool.submit(int).result()
+    return pool
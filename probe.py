@@ -0,0 +1,50 @@
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+
+
+async def _probe(target, timeout, semaphore, on_reachable):
+    target, latency = await _connect(target, timeout, semaphore)
+    if on_reachable and latency is not None:
+        # 回调在事件循环中直接执行，不能阻塞，否则会拖过总时限
+        on_reachable(target, round(latency, 4))
+    return target, latency
+
+
+async def _connect(target, timeout, semaphore):
+    async with semaphore:
+        start_time = time.monotonic()
+        try:
+            host, port = target.rsplit(":", 1)
+            _, writer = await asyncio.wait_for(asyncio.open_connection(host.strip("[]"), int(port)), timeout)
+        except (OSError, ValueError, asyncio.TimeoutError) as e:
+            logging.info(f"连接 {target} 失败: {e or type(e).__name__}")
+            return target, None
+        latency = time.monotonic() - start_time
+        writer.close()
+        return target, latency
+
+
+async def _probe_all(targets, timeout, deadline, concurrency, on_reachable):
+    semaphore = asyncio.Semaphore(concurrency)
+    tasks = [asyncio.ensure_future(_probe(target, timeout, semaphore, on_reachable)) for target in targets]
+    if not tasks:
+        return [], True
+    done, pending = await asyncio.wait(tasks, timeout=deadline)
+    for task in pending:
+        task.cancel()
+    if pending:
+        logging.info(f"连通性检测超出总时限 {deadline}s，未完成 {len(pending)} 个")
+    return [task.result() for task in done], not pending
+
+
+def probe_reachable(targets, timeout=5, deadline=20, concurrency=200, on_reachable=None):
+    """
+    并发检测所有 ip:port 的 TCP 连通性，返回 (可连通的 ip:port -> 连接耗时（秒），按耗时从低到高排序, 是否全部检测完成)。
+    on_reachable(ip:port, 耗时) 在每个连接成功时立即回调，不必等待全部检测完成；回调在事件循环中执行，不能阻塞
+    """
+    targets = list(OrderedDict.fromkeys(targets))
+    results, complete = asyncio.run(_probe_all(targets, timeout, deadline, concurrency, on_reachable))
+    reachable = [(target, round(latency, 4)) for target, latency in results if latency is not None]
+    return OrderedDict(sorted(reachable, key=lambda t: t[1])), complete
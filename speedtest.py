@@ -0,0 +1,245 @@
+import asyncio
+import logging
+import queue
+import threading
+import time
+from collections import Counter, OrderedDict, deque, namedtuple
+from collections.abc import Mapping
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from types import SimpleNamespace
+
+import aiohttp
+
+from hls import is_playlist, probe_hls
+
+# 测速结果：下载速度（MB/s）、首字节时间（秒）、建立连接时间（秒，复用连接时为 0）、HLS 实时播放比
+SpeedSample = namedtuple("SpeedSample", ["rate", "ttfb", "connect", "ratio"], defaults=[None])
+FAILED_SAMPLE = SpeedSample(0, None, None)
+
+# 每个 IP 最多测速的频道数
+SAMPLE_SIZE = 15
+
+
+def is_decided(rates, sample_size, dead_zeros, good_speed):
+    """
+    已确定为失效（零速次数达到 dead_zeros）或确定可用（不可能再达到失效条件且最大速度达到 good_speed）
+    """
+    zeros = len([x for x in rates if x == 0])
+    if zeros >= dead_zeros:
+        return True
+    return len(rates) - zeros > sample_size - dead_zeros and max(rates) >= good_speed
+
+
+def iter_lines(lines):
+    """
+    测速输入可以是 IP -> 频道列表，也可以是逐个产生 (IP, 频道列表) 的可迭代对象（如流水线队列）
+    """
+    return iter(lines.items() if isinstance(lines, Mapping) else lines)
+
+
+def _feed(source, arrivals):
+    try:
+        for item in source:
+            arrivals.put(item)
+    finally:
+        arrivals.put(None)
+
+
+def run_speed_tests(
+    lines, test, workers=30, per_host=5, sample_size=SAMPLE_SIZE, dead_zeros=10, good_speed=1.0, on_sample=None
+):
+    """
+    所有 IP 的频道共用一个调度器测速：全局并发 workers，单个 IP 并发 per_host，
+    每个 IP 最多测 sample_size 个频道，结果已确定的 IP 提前停止测速。
+    lines 为逐个产生的 (IP, 频道列表) 时，后台线程读取输入，新到的 IP 立即加入调度。
+    每个测速结果会回调 on_sample(ip, url, SpeedSample)，返回 IP -> 测速结果列表
+    """
+    arrivals = queue.Queue()
+    threading.Thread(target=_feed, args=(iter_lines(lines), arrivals), daemon=True).start()
+    feeding = True
+    queues = OrderedDict()
+    running = Counter()
+    speed_test_results = OrderedDict()
+    future_to_channel = {}
+
+    def fill(executor):
+        progress = True
+        while progress and len(future_to_channel) < workers:
+            progress = False
+            for ip, pending in queues.items():
+                if len(future_to_channel) >= workers:
+                    break
+                if pending and running[ip] < per_host:
+                    channel = pending.popleft()
+                    future_to_channel[executor.submit(test, ip, channel)] = (ip, channel)
+                    running[ip] += 1
+                    progress = True
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        while True:
+            while feeding:
+                try:
+                    # 没有可测的频道时等待新的 IP，否则只取已经到达的
+                    item = arrivals.get(block=not future_to_channel and not any(queues.values()))
+                except queue.Empty:
+                    break
+                if item is None:
+                    feeding = False
+                else:
+                    ip, channels = item
+                    queues[ip] = deque(channels[:sample_size])
+            fill(executor)
+            if not future_to_channel:
+                if feeding:
+                    continue
+                break
+            done, _ = wait(future_to_channel, timeout=0.1 if feeding else None, return_when=FIRST_COMPLETED)
+            for future in done:
+                ip, channel = future_to_channel.pop(future)
+                running[ip] -= 1
+                try:
+                    _, download_rate = future.result()
+                except Exception as exc:
+                    logging.info(f"频道：{channel.split(',')[0]} 测速时发生异常：{exc}")
+                    continue
+                if on_sample:
+                    on_sample(ip, channel.split(",", 1)[1], SpeedSample(download_rate, None, None))
+                rates = speed_test_results.setdefault(ip, [])
+                rates.append(download_rate)
+                if queues[ip] and is_decided(rates, sample_size, dead_zeros, good_speed):
+                    logging.info(f"频道IP：{ip} 已测 {len(rates)} 个频道，结果已确定，跳过剩余 {len(queues[ip])} 个")
+                    queues[ip].clear()
+
+    return speed_test_results
+
+
+def _trace_config():
+    """
+    通过 aiohttp 的请求跟踪记录建立连接耗时和请求发出时间，排除等待连接池的时间
+    """
+    trace_config = aiohttp.TraceConfig()
+
+    async def on_request_headers_sent(session, context, params):
+        if context.trace_request_ctx is not None:
+            context.trace_request_ctx.sent = time.monotonic()
+
+    async def on_connection_create_start(session, context, params):
+        if context.trace_request_ctx is not None:
+            context.trace_request_ctx.connect_start = time.monotonic()
+
+    async def on_connection_create_end(session, context, params):
+        if context.trace_request_ctx is not None:
+            context.trace_request_ctx.connect = time.monotonic() - context.trace_request_ctx.connect_start
+
+    trace_config.on_request_headers_sent.append(on_request_headers_sent)
+    trace_config.on_connection_create_start.append(on_connection_create_start)
+    trace_config.on_connection_create_end.append(on_connection_create_end)
+    return trace_config
+
+
+def create_async_session(workers=100, per_host=5, timeout=6):
+    """
+    共享连接器的 aiohttp 会话，连接器同时限制全局并发和单个主机并发
+    """
+    connector = aiohttp.TCPConnector(limit=workers, limit_per_host=per_host, ttl_dns_cache=300)
+    return aiohttp.ClientSession(
+        connector=connector,
+        timeout=aiohttp.ClientTimeout(total=None, sock_connect=timeout, sock_read=timeout),
+        trace_configs=[_trace_config()],
+    )
+
+
+async def measure(session, url, duration=3, retries=2, read_size=64 * 1024, hls_segments=2, hls_min_ratio=1.0):
+    """
+    异步下载测速：读取 duration 秒数据，数据不足 duration 秒即结束的视为失败并重试。
+    m3u8 地址改为下载 hls_segments 个分片，实时播放比低于 hls_min_ratio 的速度记为 0
+    """
+    if hls_segments and is_playlist(url, None, b""):
+        return await measure_hls(session, url, retries, hls_segments, hls_min_ratio)
+    for _ in range(retries):
+        trace = SimpleNamespace(sent=time.monotonic(), connect=0)
+        try:
+            async with session.get(url, trace_request_ctx=trace) as response:
+                response.raise_for_status()
+                ttfb = time.monotonic() - trace.sent
+                start_time = time.monotonic()
+                size = 0
+                while True:
+                    chunk = await response.content.read(read_size)
+                    if not chunk:
+                        break
+                    size += len(chunk)
+                    download_time = time.monotonic() - start_time
+                    if download_time >= duration:
+                        download_rate = round(size / download_time / 1024 / 1024, 4)
+                        return SpeedSample(download_rate, round(ttfb, 4), round(trace.connect, 4))
+        except (aiohttp.ClientError, asyncio.TimeoutError, ValueError):
+            pass
+    return FAILED_SAMPLE
+
+
+async def measure_hls(session, url, retries=2, segment_count=2, min_ratio=1.0):
+    for _ in range(retries):
+        try:
+            result, trace = await probe_hls(session, url, segment_count)
+        except (aiohttp.ClientError, asyncio.TimeoutError, ValueError):
+            continue
+        if result is None:
+            continue
+        download_rate = result.rate if result.ratio is None or result.ratio >= min_ratio else 0
+        return SpeedSample(download_rate, round(trace.ttfb, 4), round(trace.connect, 4), result.ratio)
+    return FAILED_SAMPLE
+
+
+async def _run_async_speed_tests(lines, workers, per_host, sample_size, dead_zeros, good_speed, on_sample, **options):
+    speed_test_results = OrderedDict()
+    decided = set()
+
+    async with create_async_session(workers, per_host) as session:
+
+        async def test(ip, channel):
+            if ip in decided:
+                return
+            name, url = channel.split(",", 1)
+            sample = await measure(session, url, **options)
+            logging.info(
+                f"频道：{name}, URL: {url}, 速度：{sample.rate}MB/s, 首字节：{sample.ttfb}s, "
+                f"连接：{sample.connect}s, 实时播放比：{sample.ratio}"
+            )
+            if on_sample:
+                on_sample(ip, url, sample)
+            if ip in decided:
+                return
+            rates = speed_test_results.setdefault(ip, [])
+            rates.append(sample.rate)
+            if is_decided(rates, sample_size, dead_zeros, good_speed):
+                decided.add(ip)
+                for task in tasks[ip]:
+                    if task is not asyncio.current_task():
+                        task.cancel()
+
+        # 输入可能来自阻塞的队列，在线程中读取，新到的 IP 立即开始测速
+        loop = asyncio.get_running_loop()
+        source = iter_lines(lines)
+        tasks = {}
+        while (item := await loop.run_in_executor(None, next, source, None)) is not None:
+            ip, channels = item
+            tasks[ip] = [asyncio.ensure_future(test(ip, channel)) for channel in channels[:sample_size]]
+        await asyncio.gather(*(task for ip_tasks in tasks.values() for task in ip_tasks), return_exceptions=True)
+
+    for ip in decided:
+        logging.info(f"频道IP：{ip} 已测 {len(speed_test_results[ip])} 个频道，结果已确定，跳过剩余频道")
+    return speed_test_results
+
+
+def run_async_speed_tests(
+    lines, workers=100, per_host=5, sample_size=SAMPLE_SIZE, dead_zeros=10, good_speed=1.0, on_sample=None, **options
+):
+    """
+    asyncio 测速引擎：所有频道共用一个连接器，单线程内同时进行数百个测速。
+    options 传给 measure（duration、hls_segments、hls_min_ratio 等）。
+    返回值与 run_speed_tests 相同：IP -> 测速结果列表
+    """
+    return asyncio.run(
+        _run_async_speed_tests(lines, workers, per_host, sample_size, dead_zeros, good_speed, on_sample, **options)
+    )
@@ -0,0 +1,118 @@
+import hashlib
+import json
+import logging
+import os
+from collections import OrderedDict, namedtuple
+from types import MappingProxyType
+
+from incremental import atomic_write
+
+# 模板频道：分类、显示名称（第一个别名）、全部别名
+TemplateEntry = namedtuple("TemplateEntry", ["category", "name", "aliases"])
+
+
+class Template:
+    """
+    编译后的只读模板：
+        categories  (分类, (TemplateEntry, ...)) 按模板顺序
+        entries     所有频道，下标即频道编号
+        lookup      别名 -> (频道编号, ...)
+        digest      模板文件内容的 sha1
+    """
+
+    def __init__(self, categories, digest):
+        self.categories = tuple(
+            (category, tuple(TemplateEntry(category, aliases[0], tuple(aliases)) for aliases in alias_lists))
+            for category, alias_lists in categories
+        )
+        self.entries = tuple(entry for _, entries in self.categories for entry in entries)
+        self.digest = digest
+        lookup = {}
+        for entry_id, entry in enumerate(self.entries):
+            for alias in entry.aliases:
+                entry_ids = lookup.setdefault(alias, ())
+                if entry_id not in entry_ids:
+                    lookup[alias] = entry_ids + (entry_id,)
+        self.lookup = MappingProxyType(lookup)
+
+    def to_json(self):
+        return {
+            "digest": self.digest,
+            "categories": [[category, [entry.aliases for entry in entries]] for category, entries in self.categories],
+        }
+
+
+def parse_template(lines):
+    """
+    解析模板内容：分类 -> [别名列表]，每行第一个逗号前为频道别名，用 | 分隔
+    """
+    template_channels = OrderedDict()
+    current_category = None
+
+    for line in lines:
+        line = line.strip()
+        if line and not line.startswith("#"):
+            if "#genre#" in line:
+                current_category = line.split(",")[0].strip()
+                template_channels[current_category] = []
+            elif current_category:
+                channel_name = line.split(",")[0].strip()
+                template_channels[current_category].append(channel_name.split("|"))
+
+    return template_channels
+
+
+class TemplateCache:
+    """
+    模板编译缓存：每个模板文件只解析一次，结果按文件路径保存在磁盘上。
+    文件修改时间和大小没变时直接读取缓存；变了再比较内容 sha1，内容相同只更新修改时间
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.templates = {}
+
+    def _path(self, template_file):
+        key = hashlib.sha1(os.path.abspath(template_file).encode("utf-8")).hexdigest()
+        return os.path.join(self.directory, f"{key}.json")
+
+    def load(self, template_file):
+        """
+        首次使用时才加载，同一次运行内多个配置共用同一个模板对象
+        """
+        if template_file in self.templates:
+            return self.templates[template_file]
+
+        stat = os.stat(template_file)
+        cache_path = self._path(template_file)
+        try:
+            with open(cache_path, "r", encoding="utf-8") as f:
+                cached = json.load(f)
+        except (OSError, ValueError):
+            cached = {}
+
+        if cached.get("mtime") == stat.st_mtime_ns and cached.get("size") == stat.st_size:
+            template = Template(cached["categories"], cached["digest"])
+        else:
+            with open(template_file, "rb") as f:
+                data = f.read()
+            digest = hashlib.sha1(data).hexdigest()
+            if cached.get("digest") == digest:
+                template = Template(cached["categories"], digest)
+            else:
+                categories = parse_template(data.decode("utf-8").splitlines()).items()
+                template = Template(categories, digest)
+                logging.info(f"模板 {template_file} 已重新编译，共 {len(template.entries)} 个频道")
+            self._save(cache_path, template, stat)
+
+        self.templates[template_file] = template
+        return template
+
+    def _save(self, cache_path, template, stat):
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            data = template.to_json()
+            data.update(mtime=stat.st_mtime_ns, size=stat.st_size)
+            atomic_write(cache_path, json.dumps(data, ensure_ascii=False))
+        except OSError as e:
+            logging.error(f"保存模板缓存失败❌, Error: {e}")
@@ -0,0 +1,20 @@
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from address import IPV4, IPV6, classify_urls, parse_host  # noqa: E402
+
+
+def test_parse_host_ipv6():
+    assert parse_host("http://[2409:8087::1]:8080/abc") == ("2409:8087::1", 8080)
+
+
+def test_parse_host_invalid_ipv6_url():
+    assert parse_host("http://[2409:8087::1/abc") == ("", None)
+
+
+def test_classify_urls_invalid_url_is_ipv4():
+    urls = ["http://[2409:8087::1/abc", "http://[2409:8087::1]/abc", "http://1.2.3.4/abc"]
+    assert classify_urls(urls, resolve=False) == {urls[0]: IPV4, urls[1]: IPV6, urls[2]: IPV4}
@@ -0,0 +1,58 @@
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from checkpoint import Checkpoint  # noqa: E402
+
+
+def test_resume_after_truncated_line_keeps_later_records(tmp_path):
+    path = str(tmp_path / "checkpoint.jsonl")
+    first = Checkpoint(path, 3600)
+    first.record("source", "a", [["央视频道", [["CCTV1", "http://1.1.1.1/a"]]]])
+    first.record("source", "b", [["央视频道", [["CCTV2", "http://1.1.1.1/b"]] * 100]])
+    first.file.close()
+    # 模拟写入 b 的过程中被中断
+    with open(path, "r+b") as f:
+        f.truncate(os.path.getsize(path) - 50)
+
+    second = Checkpoint(path, 3600)
+    assert second.resumed
+    assert second.has("source", "a") and not second.has("source", "b")
+    second.record("source", "b", [["央视频道", [["CCTV2", "http://1.1.1.1/b"]]]])
+    second.record("list", "1.2.3.4:8080", ["CCTV1,http://1.2.3.4:8080/1"])
+    second.file.close()
+
+    third = Checkpoint(path, 3600)
+    assert third.run_id == first.run_id
+    assert third.get("source", "b") == [["央视频道", [["CCTV2", "http://1.1.1.1/b"]]]]
+    assert third.get("list", "1.2.3.4:8080") == ["CCTV1,http://1.2.3.4:8080/1"]
+    third.finish()
+    assert not os.path.exists(path)
+
+
+def test_resume_after_line_without_newline(tmp_path):
+    path = str(tmp_path / "checkpoint.jsonl")
+    first = Checkpoint(path, 3600)
+    first.record("search", "广东", ["1.2.3.4:8080"])
+    first.file.close()
+    with open(path, "r+b") as f:
+        f.truncate(os.path.getsize(path) - 1)
+
+    second = Checkpoint(path, 3600)
+    second.record("probe", "1.2.3.4:8080", 0.1)
+    second.file.close()
+
+    third = Checkpoint(path, 3600)
+    assert third.get("search", "广东") == ["1.2.3.4:8080"]
+    assert third.get("probe", "1.2.3.4:8080") == 0.1
+
+
+def test_records_of_this_run_keep_only_keys(tmp_path):
+    checkpoint = Checkpoint(str(tmp_path / "checkpoint.jsonl"), 3600)
+    checkpoint.record("source", "a", [["央视频道", [["CCTV1", "http://1.1.1.1/a"]]]])
+    assert checkpoint.has("source", "a")
+    assert checkpoint.get("source", "a") is None
+    assert checkpoint.items("source") == []
+    checkpoint.finish()
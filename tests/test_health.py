@@ -0,0 +1,36 @@
+import os
+import sys
+from collections import OrderedDict
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import health  # noqa: E402
+from health import DEAD, UNREACHABLE, HealthResult, check_channels  # noqa: E402
+
+
+def run_check(monkeypatch, channels, outcomes):
+    async def fake_check_all(urls, *args):
+        return {url: outcomes[url] for url in urls if url in outcomes}
+
+    monkeypatch.setattr(health, "_check_all", fake_check_all)
+    return check_channels(channels)
+
+
+def test_unreachable_urls_are_kept_as_unchecked(monkeypatch):
+    v6_a = "http://[2409:8087::1]/a.m3u8"
+    v6_b = "http://[2409:8087::2]/b.m3u8"
+    v4 = "http://1.2.3.4/c.m3u8"
+    dead = "http://1.2.3.5/d.m3u8"
+    channels = OrderedDict([("央视频道", OrderedDict([("CCTV1", [v6_a, dead, v6_b, v4])]))])
+    outcomes = {v6_a: UNREACHABLE, v6_b: UNREACHABLE, dead: DEAD, v4: HealthResult(True, 0.1, None, None)}
+    checked = run_check(monkeypatch, channels, outcomes)
+    assert checked["央视频道"]["CCTV1"] == [v4, v6_a, v6_b]
+
+
+def test_only_unreachable_channel_is_kept(monkeypatch):
+    v6 = "http://[2409:8087::1]/a.m3u8"
+    v4 = "http://1.2.3.4/c.m3u8"
+    channels = OrderedDict([("央视频道", OrderedDict([("CCTV1", [v6]), ("CCTV2", [v4])]))])
+    checked = run_check(monkeypatch, channels, {v6: UNREACHABLE, v4: HealthResult(True, 0.1, None, None)})
+    assert checked["央视频道"] == OrderedDict([("CCTV1", [v6]), ("CCTV2", [v4])])
@@ -0,0 +1,71 @@
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from hotel_page import parse_list_page, parse_search_page  # noqa: E402
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+BeautifulSoup = pytest.importorskip("bs4").BeautifulSoup
+
+
+def load(name):
+    with open(os.path.join(FIXTURES, name), "r", encoding="utf-8") as f:
+        return f.read()
+
+
+def bs4_search_page(text):
+    """
+    getHotelCandidates 原先的 BeautifulSoup 提取
+    """
+    root = BeautifulSoup(text, "lxml")
+    return [item.parent.parent.a.get_text().strip() for item in root.select('div[style="color:limegreen; "]')]
+
+
+def bs4_list_page(text):
+    """
+    getHotelList 原先的 BeautifulSoup 提取
+    """
+    root = BeautifulSoup(text, "lxml")
+    return [(i.parent.select(".channel")[0].get_text().strip(), i.get_text().strip()) for i in root.select("div.m3u8")]
+
+
+def test_search_page_matches_bs4():
+    text = load("hoteliptv.html")
+    assert parse_search_page(text) == bs4_search_page(text)
+    assert parse_search_page(text) == ["113.81.10.2:8888", "183.6.20.33:4022", "[240e:3b7::8]:8080"]
+
+
+def test_list_page_matches_bs4():
+    text = load("allllist.html")
+    assert parse_list_page(text) == bs4_list_page(text)
+    assert [name for name, _ in parse_list_page(text)] == ["CCTV1高清", "CCTV5+", "广东珠江", "湖南卫视"]
+
+
+@pytest.mark.parametrize("text", ["", "   ", "<html><body></body></html>"])
+def test_empty_pages(text):
+    assert parse_search_page(text) == []
+    assert parse_list_page(text) == []
+
+
+def test_malformed_search_entry_is_skipped():
+    # 缺少链接的条目：原先整页抛出异常，现在只跳过这一条
+    text = load("hoteliptv_malformed.html")
+    with pytest.raises(AttributeError):
+        bs4_search_page(text)
+    assert parse_search_page(text) == ["113.81.10.2:8888", "183.6.20.33:4022"]
+
+
+def test_malformed_list_entry_is_skipped():
+    # 缺少 .channel 的条目：原先整页抛出异常（getHotelList 返回空列表），现在只跳过这一条
+    text = load("allllist_malformed.html")
+    with pytest.raises(IndexError):
+        bs4_list_page(text)
+    assert parse_list_page(text) == [
+        ("CCTV1高清", "http://113.81.10.2:8888/hls/1/index.m3u8"),
+        ("CCTV3高清", "http://113.81.10.2:8888/hls/3/index.m3u8"),
+    ]
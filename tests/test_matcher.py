@@ -0,0 +1,74 @@
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from matcher import EXACT, NORMALIZED, NameResolver, normalize_name  # noqa: E402
+from template import Template, parse_template  # noqa: E402
+
+
+@pytest.fixture(scope="module")
+def template():
+    with open(os.path.join(ROOT, "demo.txt"), "r", encoding="utf-8") as f:
+        return Template(parse_template(f).items(), "")
+
+
+@pytest.fixture(scope="module")
+def resolver(template):
+    return NameResolver(template)
+
+
+def resolve(template, resolver, name):
+    entry_ids, confidence = resolver.resolve(name)
+    return [template.entries[entry_id].name for entry_id in entry_ids], confidence
+
+
+@pytest.mark.parametrize(
+    "name, key",
+    [
+        ("CCTV-01 高清", "CCTV1"),
+        ("CCTV-4K 超高清", "CCTV4K"),
+        ("CCTV-4K 1080P", "CCTV4K"),
+        ("CCTV 8K", "CCTV8K"),
+        ("4K 影院", "4K影院"),
+        ("爱上 4K", "爱上4K"),
+    ],
+)
+def test_normalize_name_keeps_resolution_in_identity(name, key):
+    assert normalize_name(name) == key
+
+
+@pytest.mark.parametrize(
+    "name, expected",
+    [
+        ("CCTV-4K 超高清", (["CCTV4K超高清"], EXACT)),
+        ("CCTV 4K", (["CCTV4K超高清"], NORMALIZED)),
+        ("4K 影院", (["4K影院"], NORMALIZED)),
+        ("爱上 4K", (["爱上4K"], NORMALIZED)),
+        ("CCTV-01 高清", (["CCTV1综合"], NORMALIZED)),
+        ("CCTV 5", (["CCTV5体育"], NORMALIZED)),
+        ("CCTV-5+ 高清", (["CCTV5+体育赛事"], NORMALIZED)),
+    ],
+)
+def test_resolve(template, resolver, name, expected):
+    assert resolve(template, resolver, name) == expected
+
+
+@pytest.mark.parametrize("name", ["CCTV-8K", "CCTV 8K", "CCTV", "CCTV高清", "影院", "爱上", "广东", "C"])
+def test_resolve_rejects_generic_or_different_channels(template, resolver, name):
+    assert resolve(template, resolver, name) == ([], 0)
+
+
+@pytest.mark.parametrize(
+    "name, expected",
+    [
+        ("广东体育+", ([], 0)),
+        ("广东体育 +", ([], 0)),
+        ("CCTV5+体育", (["CCTV5+体育赛事"], 0.875)),
+    ],
+)
+def test_plus_variants_only_match_plus_channels(template, resolver, name, expected):
+    assert resolve(template, resolver, name) == expected
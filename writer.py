@@ -0,0 +1,125 @@
+import gzip
+import json
+
+LOGO_URL = "https://gitee.com/yuanzl77/TVBox-logo/raw/main/png/{}.png"
+# 输出格式版本：渲染逻辑改变时加一，增量构建会重新生成所有输出
+FORMAT_VERSION = 1
+
+
+class M3uFormat:
+    extension = "m3u"
+
+    def __init__(self):
+        self.parts = []
+
+    def category(self, category):
+        pass
+
+    def channel(self, category, channel_name, urls):
+        # 同一频道的所有线路共用 tvg-id 之后的固定部分
+        tail = (
+            f'" tvg-name="{channel_name}" tvg-logo="{LOGO_URL.format(channel_name)}" '
+            f'group-title="{category}",{channel_name}\n'
+        )
+        for index, url in enumerate(urls, start=1):
+            self.parts += ('#EXTINF:-1 tvg-id="', str(index), tail, url, "\n")
+
+    def render(self, epg_urls, announcements):
+        head = [f"""#EXTM3U x-tvg-url={",".join(f'"{epg_url}"' for epg_url in epg_urls)}\n"""]
+        for group, entries in announcements:
+            for name, logo, url in entries:
+                head.append(f'#EXTINF:-1 tvg-id="1" tvg-name="{name}" tvg-logo="{logo}" group-title="{group}",{name}\n')
+                head.append(f"{url}\n")
+        return "".join(head + self.parts)
+
+
+class TxtFormat:
+    extension = "txt"
+
+    def __init__(self):
+        self.parts = []
+
+    def category(self, category):
+        self.parts.append(f"{category},#genre#\n")
+
+    def channel(self, category, channel_name, urls):
+        prefix = f"{channel_name},"
+        for url in urls:
+            self.parts += (prefix, url, "\n")
+
+    def render(self, epg_urls, announcements):
+        head = []
+        for group, entries in announcements:
+            head.append(f"{group},#genre#\n")
+            for name, _, url in entries:
+                head.append(f"{name},{url}\n")
+        return "".join(head + self.parts) + "\n"
+
+
+class JsonFormat:
+    extension = "json"
+
+    def __init__(self):
+        self.categories = []
+
+    def category(self, category):
+        self.categories.append({"name": category, "channels": []})
+
+    def channel(self, category, channel_name, urls):
+        self.categories[-1]["channels"].append(
+            {"name": channel_name, "logo": LOGO_URL.format(channel_name), "urls": urls}
+        )
+
+    def render(self, epg_urls, announcements):
+        data = {
+            "epg_urls": list(epg_urls),
+            "announcements": [
+                {
+                    "name": group,
+                    "channels": [{"name": name, "logo": logo, "urls": [url]} for name, logo, url in entries],
+                }
+                for group, entries in announcements
+            ],
+            "categories": self.categories,
+        }
+        return json.dumps(data, ensure_ascii=False, indent=1) + "\n"
+
+
+class GzipFormat:
+    """
+    任意格式的 gzip 压缩版本，固定压缩时间戳，内容不变时压缩结果也不变
+    """
+
+    def __init__(self, inner):
+        self.inner = inner
+        self.extension = f"{inner.extension}.gz"
+
+    def category(self, category):
+        self.inner.category(category)
+
+    def channel(self, category, channel_name, urls):
+        self.inner.channel(category, channel_name, urls)
+
+    def render(self, epg_urls, announcements):
+        return gzip.compress(self.inner.render(epg_urls, announcements).encode("utf-8"), mtime=0)
+
+
+FORMATS = {
+    "m3u": M3uFormat,
+    "txt": TxtFormat,
+    "json": JsonFormat,
+}
+
+
+def create_formats(names):
+    """
+    按名称创建输出格式，"m3u.gz" 这类名称为对应格式的 gzip 版本
+    """
+    formats = []
+    for name in names:
+        base, _, compression = name.partition(".")
+        if base not in FORMATS or compression not in ("", "gz"):
+            raise ValueError(f"不支持的输出格式：{name}")
+        output_format = FORMATS[base]()
+        formats.append(GzipFormat(output_format) if compression else output_format)
+    return formats